@@ -5,12 +5,154 @@ Analyzes personal Netflix viewing activity.
 # Import necessary libraries
 import pandas as pd
 from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+from matplotlib.collections import PolyCollection
+import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
+import altair as alt
 from datetime import datetime, timezone
+import json
+import os
+import re
+import sys
+import threading
+from functools import lru_cache
 pd.options.mode.chained_assignment = None
 
+_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+_SHORT_DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# Columns narrowed by the profile, content type and title filters, and the choices that keep every row
+_FILTER_COLUMNS = ("Profile Name", "Type", "Name")
+_UNFILTERED = {"All Profiles", "All Types", "All Titles"}
+
+# Format version of summary bundles, raised whenever their tables change shape
+_SUMMARY_VERSION = 3
+_SUMMARY_DIMENSIONS = list(_FILTER_COLUMNS)
+
+# Category and value axis labels of each analysis when drawn as a single series
+_AXIS_LABELS = {
+    "Countries": ("Countries", "Frequency"),
+    "Device Types": ("Devices", "Frequency"),
+    "Viewing Frequency": ("Profile Names", "Frequency"),
+    "Viewing Activity Timeline": ("Date", "Frequency"),
+    "Viewing Heat Map": ("Hour of Day", "Day of Week"),
+    "Most Watched Movies": ("Movies", "Frequency"),
+    "Most Watched Shows": ("Shows", "Frequency"),
+    "Most Watched Days": ("Day of Week", "Frequency"),
+    "Most Watched Episodes": ("Episodes", "Frequency"),
+    "Duration": ("Duration", "Frequency"),
+    "Trends": ("Date", "Watch Hours"),
+}
+_HORIZONTAL_ANALYSES = {"Device Types"}
+
+# Device families matched in order against raw device names, so consoles win over the TVs they are sold with
+_DEVICE_RULES = [
+    (re.compile(r"xbox|playstation|\bps[345]\b|nintendo|\bwii\b", re.IGNORECASE), "Console"),
+    (re.compile(r"ipad|tablet|kindle|\btab\b", re.IGNORECASE), "Tablet"),
+    (re.compile(r"iphone|phone|android mobile|pixel|galaxy s|ipod", re.IGNORECASE), "Phone"),
+    (re.compile(r"\btv\b|roku|chromecast|fire stick|smart|uhd|oled|bravia|vizio|tivo|set[- ]top|blu-ray", re.IGNORECASE), "TV"),
+    (re.compile(r"\bmac\b|\bpc\b|chrome|safari|firefox|edge|opera|cadmium|browser|windows", re.IGNORECASE), "Browser"),
+]
+_DEFAULT_DEVICE_FAMILY = "Other"
+
+# ISO codes of countries that exports name without the usual "US (United States)" prefix
+_COUNTRY_CODES = {
+    "Argentina": "AR", "Australia": "AU", "Austria": "AT", "Belgium": "BE", "Brazil": "BR",
+    "Canada": "CA", "Chile": "CL", "Colombia": "CO", "Denmark": "DK", "Finland": "FI",
+    "France": "FR", "Germany": "DE", "Greece": "GR", "Hong Kong": "HK", "India": "IN",
+    "Indonesia": "ID", "Ireland": "IE", "Israel": "IL", "Italy": "IT", "Japan": "JP",
+    "Malaysia": "MY", "Mexico": "MX", "Netherlands": "NL", "New Zealand": "NZ", "Norway": "NO",
+    "Philippines": "PH", "Poland": "PL", "Portugal": "PT", "Singapore": "SG", "South Africa": "ZA",
+    "South Korea": "KR", "Spain": "ES", "Sweden": "SE", "Switzerland": "CH", "Taiwan": "TW",
+    "Thailand": "TH", "Turkey": "TR", "United Kingdom": "GB", "United States": "US", "Vietnam": "VN",
+}
+_COUNTRY_PREFIX = re.compile(r"^([A-Z]{2}) \(")
+
+# Raw columns and the normalized columns their family rollups are counted from
+_FAMILY_COLUMNS = {"Device Type": "Device Family", "Country": "Country Code"}
+
+# Rolling windows in days and the daily metrics they are computed over for the trends analysis
+_TREND_WINDOWS = (7, 30, 90)
+_TREND_METRICS = ("Watch Hours", "Sessions")
+_NO_ACTIVITY_MESSAGE = "No viewing activity matches the chosen filters"
+
+# Bars beyond this count are drawn as a single collection without value labels
+_BAR_LABEL_LIMIT = 40
+
+# Stacked categories beyond this count are folded into a single "Other" segment
+_LEGEND_LIMIT = 10
+_STACKED_ANALYSES = {"Countries", "Device Types", "Duration"}
+
+# Released figures waiting to be redrawn, keyed by figure size
+_FIGURE_POOL = {}
+_FIGURE_POOL_LIMIT = 4
+_FIGURE_POOL_LOCK = threading.Lock()
+
+# Chart titles keyed by content filter, with {who} replaced by the profile and {title} by the chosen title
+_TITLE_TEMPLATES = {
+    "Countries": {
+        "All Types": "Where {who} Watched Netflix",
+        "Movie": "Where {who} Watched Movies",
+        "TV Show": "Where {who} Watched TV Shows",
+        "title": "Where {who} Watched '{title}'",
+    },
+    "Device Types": {
+        "All Types": "Devices {who} Used to Watch Netflix",
+        "Movie": "Devices {who} Used to Watch Movies",
+        "TV Show": "Devices {who} Used to Watch TV Shows",
+        "title": "Devices {who} Used to Watch '{title}'",
+    },
+    "Viewing Frequency": {
+        "All Types": "Netflix Viewing Frequency of {who}",
+        "Movie": "Netflix Movie Viewing Frequency of {who}",
+        "TV Show": "Netflix TV Show Viewing Frequency of {who}",
+        "title": "Netflix Viewing Frequency of {who} for '{title}'",
+    },
+    "Viewing Activity Timeline": {
+        "All Types": "Netflix Viewing Activity Timeline of {who}",
+        "Movie": "Netflix Movie Viewing Activity Timeline of {who}",
+        "TV Show": "Netflix TV Show Viewing Activity Timeline of {who}",
+        "title": "Netflix Viewing Activity Timeline of {who} for '{title}'",
+    },
+    "Viewing Heat Map": {
+        "All Types": "Heatmap of Netflix Viewing Activity of {who}",
+        "Movie": "Heatmap of Netflix Movie Viewing Activity of {who}",
+        "TV Show": "Heatmap of Netflix TV Show Viewing Activity of {who}",
+        "title": "Heatmap of Netflix Viewing Activity of {who} for '{title}'",
+    },
+    "Most Watched Movies": {
+        "All Types": "Most Watched Movies by {who}",
+    },
+    "Most Watched Shows": {
+        "All Types": "Most Watched TV Shows by {who}",
+    },
+    "Most Watched Days": {
+        "All Types": "Most Watched Days by {who}",
+        "Movie": "Most Watched Days for Movies by {who}",
+        "TV Show": "Most Watched Days for TV Shows by {who}",
+        "title": "Most Watched Days for '{title}' by {who}",
+    },
+    "Most Watched Episodes": {
+        "All Types": "Most Watched Episodes of '{title}' by {who}",
+    },
+    "Duration": {
+        "All Types": "Duration of Content {who} Watched on Netflix",
+        "Movie": "Duration of Movies {who} Watched on Netflix",
+        "TV Show": "Duration of TV Shows {who} Watched on Netflix",
+        "title": "Duration of '{title}' {who} Watched on Netflix",
+        "profile title": "Duration of '{title}' Watched By {who}",
+    },
+    "Trends": {
+        "All Types": "Netflix Viewing Trends of {who}",
+        "Movie": "Netflix Movie Viewing Trends of {who}",
+        "TV Show": "Netflix TV Show Viewing Trends of {who}",
+        "title": "Netflix Viewing Trends of {who} for '{title}'",
+    },
+}
+
 
 def load_data(data_file: str) -> pd.DataFrame:
     """
@@ -104,22 +246,120 @@ def separate_types_of_content(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def conduct_analysis(df: pd.DataFrame, analysis: str, profile: str, content_type: str, title: str):
+def normalize_devices_and_countries(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Conducts analysis instructed by user.
+    Adds device family and country code columns, looking each distinct raw value up only once.
 
     Parameters:
         df (pd.DataFrame): viewing data
+
+    Returns:
+        pd.DataFrame: updated viewing data with "Device Family" and "Country Code" columns
+    """
+
+    for column, family_column in _FAMILY_COLUMNS.items():
+        df[family_column] = _normalize_column(df[column], column)
+
+    return df
+
+
+def add_device_rule(pattern: str, family: str) -> None:
+    """
+    Registers a device family for raw device names matching a pattern, checked before the built-in rules.
+
+    Parameters:
+        pattern (str): case insensitive regular expression searched for in raw device names
+        family (str): device family given to matching devices
+    """
+
+    _DEVICE_RULES.insert(0, (re.compile(pattern, re.IGNORECASE), sys.intern(family)))
+    _device_family.cache_clear()
+
+
+def add_country_code(name: str, code: str) -> None:
+    """
+    Registers the ISO code of a country that exports name without a code prefix.
+
+    Parameters:
+        name (str): country name as it appears in the export
+        code (str): two letter ISO country code
+    """
+
+    _COUNTRY_CODES[name] = code
+    _country_code.cache_clear()
+
+
+def build_filter_index(df: pd.DataFrame) -> dict:
+    """
+    Maps each profile, content type and title to the row positions holding it.
+
+    Parameters:
+        df (pd.DataFrame): viewing data separated by type of content
+
+    Returns:
+        dict: sorted row positions keyed by column and then by value
+    """
+
+    return {column: df.groupby(column).indices for column in _FILTER_COLUMNS}
+
+
+def filter_view(df: pd.DataFrame, index: dict, profile: str, content_type: str, title: str) -> pd.DataFrame:
+    """
+    Narrows viewing data to the chosen filters using row positions instead of scanning every row.
+
+    Parameters:
+        df (pd.DataFrame): viewing data separated by type of content
+        index (dict): row positions from build_filter_index
+        profile (str): chosen profile(s) to analyze
+        content_type (str): chosen types of content to analyze
+        title (str): chosen title(s) to analyze
+
+    Returns:
+        pd.DataFrame: viewing data matching the filters
+    """
+
+    positions = None
+    for column, value in zip(_FILTER_COLUMNS, (profile, content_type, title)):
+        if value in _UNFILTERED:
+            continue
+        rows = index[column].get(value, np.array([], dtype=np.intp))
+        positions = rows if positions is None else np.intersect1d(positions, rows, assume_unique=True)
+
+    if positions is None:
+        return df
+    return df.take(positions)
+
+
+def conduct_analysis(df: pd.DataFrame | dict, analysis: str, profile: str, content_type: str, title: str, renderer: str = "matplotlib", rollup: bool = False, daily: pd.DataFrame = None, trends: pd.DataFrame = None):
+    """
+    Conducts analysis instructed by user.
+
+    Parameters:
+        df (pd.DataFrame | dict): viewing data, or a summary bundle from load_summary
         analysis (str): chosen analysis option
         profile (str): chosen profile(s) to analyze
         content_type (str): chosen types of content to analyze
         title (str): chosen title(s) to analyze
+        renderer (str): "matplotlib" to draw a figure on the server or "altair" to return a chart spec drawn in the browser
+        rollup (bool): count device families and country codes instead of raw device and country names
+        daily (pd.DataFrame): daily activity kept from an earlier trends analysis of the same selection
+        trends (pd.DataFrame): rolling trends kept alongside daily
+
+    Returns:
+        Figure | alt.Chart: matplotlib figure or altair chart containing results of the analysis
     """
 
+    if renderer == "altair":
+        if analysis == "Trends" and daily is not None:
+            data = daily
+        else:
+            data = aggregate_analysis(df, analysis, profile, content_type, rollup)
+        return interactive_chart(data, analysis, _analysis_title(analysis, profile, content_type, title), trends)
+
     if analysis == "Countries":
-        figure = countries_analysis(df, profile, content_type, title)
+        figure = countries_analysis(df, profile, content_type, title, rollup)
     elif analysis == "Device Types":
-        figure = devices_analysis(df, profile, content_type, title)
+        figure = devices_analysis(df, profile, content_type, title, rollup)
     elif analysis == "Viewing Frequency":
         figure = viewing_frequency_analysis(df, profile, content_type, title)
     elif analysis == "Viewing Activity Timeline":
@@ -136,11 +376,141 @@ def conduct_analysis(df: pd.DataFrame, analysis: str, profile: str, content_type
         figure = most_watched_episodes_analysis(df, profile, title)
     elif analysis == "Duration":
         figure = duration_analysis(df, profile, content_type, title)
+    elif analysis == "Trends":
+        figure = trends_analysis(df, profile, content_type, title, daily, trends)
     
     return figure
 
 
-def countries_analysis(df: pd.DataFrame, profile: str, content_type: str, title: str) -> Figure:
+def aggregate_analysis(df: pd.DataFrame | dict, analysis: str, profile: str, content_type: str, rollup: bool = False) -> pd.Series | pd.DataFrame:
+    """
+    Computes the aggregated data behind an analysis without drawing it.
+
+    Parameters:
+        df (pd.DataFrame | dict): viewing data, or a summary bundle from load_summary
+        analysis (str): chosen analysis option
+        profile (str): chosen profile(s) to analyze
+        content_type (str): chosen types of content to analyze
+        rollup (bool): count device families and country codes instead of raw device and country names
+
+    Returns:
+        pd.Series | pd.DataFrame: counts per category, a profile by category table for stacked analyses, or daily activity for trends
+    """
+
+    if isinstance(df, dict):
+        data = _aggregate_summary(df, analysis, profile, content_type, rollup)
+    elif analysis == "Countries":
+        data = _count_by_profile(*_rollup_column(df, "Country", rollup), profile)
+    elif analysis == "Device Types":
+        data = _count_by_profile(*_rollup_column(df, "Device Type", rollup), profile)
+    elif analysis == "Viewing Frequency":
+        data = _rank_counts(df["Profile Name"].value_counts())
+    elif analysis == "Viewing Activity Timeline":
+        data = _daily_counts(df["Date"].value_counts())
+    elif analysis == "Viewing Heat Map":
+        by_hour = df["Start Time"].value_counts()
+        start_hours = _start_hours(by_hour.index)
+        data = _hourly_matrix(by_hour.groupby([start_hours.weekday, start_hours.hour]).sum())
+    elif analysis == "Most Watched Movies":
+        data = _top_ten(df[df["Type"] == "Movie"]["Name"].value_counts())
+    elif analysis == "Most Watched Shows":
+        data = _top_ten(df[df["Type"] == "TV Show"]["Name"].value_counts())
+    elif analysis == "Most Watched Days":
+        data = _weekday_counts(df["Day"].value_counts())
+    elif analysis == "Most Watched Episodes":
+        data = _top_ten(df["Episode"].value_counts())
+    elif analysis == "Duration":
+        data = _duration_counts(df, profile, content_type)
+    elif analysis == "Trends":
+        data = daily_activity(df)
+
+    # Both renderers draw the same stacked categories, so the fold happens before either sees the table
+    if analysis in _STACKED_ANALYSES and isinstance(data, pd.DataFrame):
+        data = _fold_categories(data, _LEGEND_LIMIT)
+
+    return data
+
+
+def interactive_chart(data: pd.Series | pd.DataFrame, analysis: str, chart_title: str, trends: pd.DataFrame = None) -> alt.Chart:
+    """
+    Builds a Vega-Lite chart from aggregated data so it is drawn in the browser.
+
+    Parameters:
+        data (pd.Series | pd.DataFrame): aggregated data from aggregate_analysis
+        analysis (str): chosen analysis option
+        chart_title (str): title displayed above the chart
+        trends (pd.DataFrame): rolling trends of data for the trends analysis, computed from data when not given
+
+    Returns:
+        alt.Chart: altair chart containing results of the analysis
+    """
+
+    category_label, value_label = _AXIS_LABELS[analysis]
+
+    if analysis == "Trends":
+        if data.empty:
+            message = pd.DataFrame({"Message": [_NO_ACTIVITY_MESSAGE]})
+            return alt.Chart(message).mark_text(size=14).encode(text="Message:N").properties(title=chart_title)
+        if trends is None:
+            trends = rolling_trends(data)
+        charts = []
+        for metric in _TREND_METRICS:
+            lines, line_title = _trend_lines(trends, metric)
+            series = lines.columns.name
+            source = lines.melt(ignore_index=False, value_name="Value").reset_index()
+            source["Date"] = source["Date"].dt.strftime("%Y-%m-%d")
+            # Inline records skip altair's row limit, which a few years of daily lines per profile exceed
+            charts.append(alt.Chart(alt.InlineData(values=source.to_dict("records"))).mark_line().encode(
+                x=alt.X("Date:T", title=category_label),
+                y=alt.Y("Value:Q", title=metric),
+                color=alt.Color(f"{series}:N", sort=None),
+                tooltip=["Date:T", f"{series}:N", "Value:Q"]).properties(title=line_title).interactive(bind_y=False))
+        yearly = year_over_year(data).reset_index()
+        charts.append(alt.Chart(yearly).mark_bar().encode(
+            x=alt.X("Year:O"),
+            y=alt.Y("Watch Hours:Q", title=value_label),
+            color=alt.Color("Year:O", scale=alt.Scale(scheme="viridis"), legend=None),
+            opacity=alt.condition("datum['Partial Year']", alt.value(0.5), alt.value(1.0)),
+            tooltip=list(yearly.columns)))
+        return alt.vconcat(*charts).properties(title=chart_title)
+
+    if analysis == "Viewing Heat Map":
+        source = data.rename_axis(index="Day", columns="Hour").stack().rename("Frequency").reset_index()
+        source["Day"] = source["Day"].map(dict(enumerate(_SHORT_DAYS)))
+        chart = alt.Chart(source).mark_rect().encode(
+            x=alt.X("Hour:O", title=category_label),
+            y=alt.Y("Day:O", sort=_SHORT_DAYS, title=value_label),
+            color=alt.Color("Frequency:Q", scale=alt.Scale(scheme="viridis")),
+            tooltip=["Day", "Hour", "Frequency"])
+        return chart.properties(title=chart_title)
+
+    if isinstance(data, pd.DataFrame):
+        source = data.rename_axis(index="Profile", columns="Category").stack().rename("Frequency").reset_index()
+        chart = alt.Chart(source).mark_bar().encode(
+            x=alt.X("Profile:N", title="Profiles", axis=alt.Axis(labelAngle=-30)),
+            y=alt.Y("Frequency:Q", title="Frequency"),
+            color=alt.Color("Category:N", title=category_label),
+            tooltip=["Profile", "Category", "Frequency"])
+        return chart.properties(title=chart_title).interactive(bind_x=False)
+
+    source = pd.DataFrame({"Category": data.index, "Frequency": data.values, "Rank": np.arange(len(data))})
+    category_type = "T" if analysis == "Viewing Activity Timeline" else "N"
+    category = alt.X(f"Category:{category_type}", title=category_label, sort=None)
+    frequency = alt.Y("Frequency:Q", title=value_label)
+    if analysis in _HORIZONTAL_ANALYSES:
+        category = alt.Y("Category:N", title=category_label, sort=None)
+        frequency = alt.X("Frequency:Q", title=value_label)
+    chart = alt.Chart(source).mark_bar().encode(
+        category,
+        frequency,
+        color=alt.Color("Rank:Q", scale=alt.Scale(scheme="viridis"), legend=None),
+        tooltip=["Category", "Frequency"])
+    if analysis == "Viewing Activity Timeline":
+        return chart.properties(title=chart_title).interactive(bind_y=False)
+    return chart.properties(title=chart_title)
+
+
+def countries_analysis(df: pd.DataFrame, profile: str, content_type: str, title: str, rollup: bool = False) -> Figure:
     """
     Conducts analysis based on countries watched from.
 
@@ -149,67 +519,19 @@ def countries_analysis(df: pd.DataFrame, profile: str, content_type: str, title:
         profile (str): chosen profile(s) to analyze
         content_type (str): chosen types of content to analyze
         title (str): chosen title(s) to analyze
+        rollup (bool): count ISO country codes instead of raw country names
     
     Returns:
         fig (Figure): matplotlib figure containing results of the analysis
     """
 
-    if profile == "All Profiles":
-        profiles = [n for n in {name for name in df["Profile Name"]}]
-        countries = [c for c in {country for country in df["Country"]}]
-        country_values = []
-        fig, ax = plt.subplots(figsize=(6, 8))
-        for country in countries:
-            values = []
-            for profile in profiles:
-                temp_countries = df[df["Country"] == country]
-                temp_data = temp_countries[temp_countries["Profile Name"] == profile]
-                try:
-                    values.append(temp_data["Country"].value_counts().values[0])
-                except IndexError:
-                    values.append(0)
-            country_values.append(values)
-        for i in range(len(country_values)):
-            if i == 0:
-                ax.bar(profiles, country_values[i], label=countries[i])
-            else:
-                ax.bar(profiles, country_values[i], bottom=country_values[i - 1], label=countries[i])
-        ax.set_xlabel("Profiles", fontsize=12, labelpad=1)
-        ax.set_ylabel("Frequency", fontsize=12)
-        ax.tick_params(axis="x", labelrotation=30, labelsize=8)
-        if content_type == "All Types":
-            ax.set_title("Where All Profiles Watched Netflix", fontsize=14)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Where All Profiles Watched Movies", fontsize=14)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Where All Profiles Watched TV Shows", fontsize=14)
-        else:
-            ax.set_title("Where All Profiles Watched '" + title + "'", fontsize=14)
-        ax.legend()
-        return fig
-    else:
-        countries = df["Country"].value_counts()
-        amount = len(countries)
-        x = np.arange(amount)
-        colors = plt.get_cmap("viridis")
-        fig, ax = plt.subplots(figsize=(6, 8))
-        bars = ax.bar(countries.index, countries.values, color=colors(x / amount))
-        ax.set_xlabel("Countries", fontsize=12, labelpad=1)
-        ax.set_ylabel("Frequency", fontsize=12)
-        ax.tick_params(axis="x", labelrotation=30, labelsize=8)
-        ax.bar_label(bars, label_type="edge")
-        if content_type == "All Types":
-            ax.set_title("Where " + profile + " Watched Netflix", fontsize=14)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Where " + profile + " Watched Movies", fontsize=14)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Where " + profile + " Watched TV Shows", fontsize=14)
-        else:
-            ax.set_title("Where " + profile + " Watched '" + title + "'", fontsize=14)
-        return fig
+    data = aggregate_analysis(df, "Countries", profile, content_type, rollup)
+    chart_title = _analysis_title("Countries", profile, content_type, title)
+
+    return _bar_chart(data, "Countries", chart_title, figsize=(6, 8))
 
 
-def devices_analysis(df: pd.DataFrame, profile: str, content_type: str, title: str) -> Figure:
+def devices_analysis(df: pd.DataFrame, profile: str, content_type: str, title: str, rollup: bool = False) -> Figure:
     """
     Conducts analysis based on devices watched from.
 
@@ -218,65 +540,17 @@ def devices_analysis(df: pd.DataFrame, profile: str, content_type: str, title: s
         profile (str): chosen profile(s) to analyze
         content_type (str): chosen types of content to analyze
         title (str): chosen title(s) to analyze
+        rollup (bool): count device families instead of raw device names
 
     Returns:
         fig (Figure): matplotlib figure containing results of the analysis
     """
 
-    if profile == "All Profiles":
-        profiles = [n for n in {name for name in df["Profile Name"]}]
-        devices = [d for d in {device for device in df["Device Type"]}]
-        device_values = []
-        fig, ax = plt.subplots(figsize=(6, 8))
-        for device in devices:
-            values = []
-            for profile in profiles:
-                temp_devices = df[df["Device Type"] == device]
-                temp_data = temp_devices[temp_devices["Profile Name"] == profile]
-                try:
-                    values.append(temp_data["Device Type"].value_counts().values[0])
-                except IndexError:
-                    values.append(0)
-            device_values.append(values)
-        for i in range(len(device_values)):
-            if i == 0:
-                ax.bar(profiles, device_values[i], label=devices[i])
-            else:
-                ax.bar(profiles, device_values[i], bottom=device_values[i - 1], label=devices[i])
-        ax.set_xlabel("Profiles", fontsize=12, labelpad=1)
-        ax.set_ylabel("Frequency", fontsize=12)
-        ax.tick_params(axis="x", labelrotation=30, labelsize=8)
-        if content_type == "All Types":
-            ax.set_title("Devices All Profiles Used to Watch Netflix", fontsize=14)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Devices All Profiles Used to Watch Movies", fontsize=14)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Devices All Profiles Used to Watch TV Shows", fontsize=14)
-        else:
-            ax.set_title("Devices All Profiles Used to Watch '" + title + "'", fontsize=14)
-        ax.legend()
-        return fig
-    else:
-        devices = df["Device Type"].value_counts()
-        amount = len(devices)
-        x = np.arange(amount)
-        colors = plt.get_cmap("viridis")
-        fig, ax = plt.subplots(figsize=(14, 6))
-        bars = plt.barh(devices.index, devices.values, color=colors(x / amount))
-        ax.set_xlabel("Frequency", fontsize=12)
-        ax.set_ylabel("Devices", fontsize=12, labelpad=1)
-        ax.tick_params(axis="both", labelsize=8)
-        ax.bar_label(bars, label_type="edge")
-        if content_type == "All Types":
-            ax.set_title("Devices " + profile + " Used to Watch Netflix", fontsize=14)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Devices " + profile + " Used to Watch Movies", fontsize=14)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Devices " + profile + " Used to Watch TV Shows", fontsize=14)
-        else:
-            ax.set_title("Devices " + profile + " Used to Watch '" + title + "'", fontsize=14)
-        ax.invert_yaxis()
-        return fig
+    data = aggregate_analysis(df, "Device Types", profile, content_type, rollup)
+    chart_title = _analysis_title("Device Types", profile, content_type, title)
+    figsize = (6, 8) if profile == "All Profiles" else (14, 6)
+
+    return _bar_chart(data, "Device Types", chart_title, figsize=figsize)
 
 
 def viewing_frequency_analysis(df: pd.DataFrame, profile: str, content_type: str, title: str) -> Figure:
@@ -293,35 +567,10 @@ def viewing_frequency_analysis(df: pd.DataFrame, profile: str, content_type: str
         fig (Figure): matplotlib figure containing results of the analysis
     """
 
-    profile_count = df["Profile Name"].value_counts()
-    amount = len(profile_count)
-    x = np.arange(amount)
-    colors = plt.get_cmap("viridis")
-    fig, ax = plt.subplots(figsize=(8, 6))
-    bars = ax.bar(profile_count.index, profile_count.values, color=colors(x / amount))
-    ax.set_xlabel("Profile Names", fontsize=12, labelpad=1)
-    ax.set_ylabel("Frequency", fontsize=12)
-    ax.tick_params(axis="x", labelrotation=30, labelsize=8)
-    ax.bar_label(bars, label_type="edge")
-    if profile == "All Profiles":
-        if content_type == "All Types":
-            ax.set_title("Netflix Viewing Frequency of All Profiles", fontsize=14)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Netflix Movie Viewing Frequency of All Profiles", fontsize=14)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Netflix TV Show Viewing Frequency of All Profiles", fontsize=14)
-        else:
-            ax.set_title("Netflix Viewing Frequency of All Profiles for '" + title + "'", fontsize=14)
-    else:
-        if content_type == "All Types":
-            ax.set_title("Netflix Viewing Frequency of " + profile, fontsize=14)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Netflix Movie Viewing Frequency of " + profile, fontsize=14)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Netflix TV Show Viewing Frequency of " + profile, fontsize=14)
-        else:
-            ax.set_title("Netflix Viewing Frequency of " + profile + " for '" + title + "'", fontsize=14)
-    return fig
+    data = aggregate_analysis(df, "Viewing Frequency", profile, content_type)
+    chart_title = _analysis_title("Viewing Frequency", profile, content_type, title)
+
+    return _bar_chart(data, "Viewing Frequency", chart_title, figsize=(8, 6))
 
 
 def viewing_activity_analysis(df :pd.DataFrame, profile: str, content_type: str, title: str) -> Figure:
@@ -338,40 +587,10 @@ def viewing_activity_analysis(df :pd.DataFrame, profile: str, content_type: str,
         fig (Figure): matplotlib figure containing results of the analysis
     """
 
-    by_date = pd.Series(df["Date"]).value_counts().sort_index()
-    by_date.index = pd.DatetimeIndex(by_date.index)
-    date_count = by_date.rename_axis("Date").reset_index(name="Count")
-    idx = pd.date_range(min(by_date.index), max(by_date.index))
-    date_count = by_date.reindex(idx, fill_value=0)
-    amount = len(date_count)
-    x = np.arange(amount)
-    colors = plt.get_cmap("viridis")
+    data = aggregate_analysis(df, "Viewing Activity Timeline", profile, content_type)
+    chart_title = _analysis_title("Viewing Activity Timeline", profile, content_type, title)
 
-    fig, ax = plt.subplots(figsize=(8, 6))
-    bars = ax.bar(date_count.index, date_count.values, color=colors(x / amount))
-    ax.set_xlabel("Date", fontsize=12, labelpad=1)
-    ax.set_ylabel("Frequency", fontsize=12)
-    ax.tick_params(axis="x", labelrotation=30, labelsize=8)
-    ax.bar_label(bars, label_type="edge")
-    if profile == "All Profiles":
-        if content_type == "All Types":
-            ax.set_title("Netflix Viewing Activity Timeline of All Profiles", fontsize=14)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Netflix Movie Viewing Activity Timeline of All Profiles", fontsize=14)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Netflix TV Show Viewing Activity Timeline of All Profiles", fontsize=14)
-        else:
-            ax.set_title("Netflix Viewing Activity Timeline of All Profiles for '" + title + "'", fontsize=14)
-    else:
-        if content_type == "All Types":
-            ax.set_title("Netflix Viewing Activity Timeline of " + profile, fontsize=14)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Netflix Movie Viewing Activity Timeline of " + profile, fontsize=14)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Netflix TV Show Viewing Activity Timeline of " + profile, fontsize=14)
-        else:
-            ax.set_title("Netflix Viewing Activity Timeline of " + profile + " for '" + title + "'", fontsize=14)
-    return fig
+    return _bar_chart(data, "Viewing Activity Timeline", chart_title, figsize=(8, 6))
 
 
 def viewing_heat_map(df: pd.DataFrame, profile: str, content_type: str, title: str) -> Figure:
@@ -388,45 +607,14 @@ def viewing_heat_map(df: pd.DataFrame, profile: str, content_type: str, title: s
         fig (Figure): matplotlib figure containing results of the analysis
     """
 
-    by_hour = df["Start Time"].value_counts().sort_index(ascending=True)
-    by_hour.index = pd.to_datetime(by_hour.index)
-    hour_count = by_hour.rename_axis("Date Hour").reset_index(name="Count")
-    idx = pd.date_range(min(by_hour.index), max(by_hour.index), freq="1H")
-    hour_count = by_hour.reindex(idx, fill_value=0)
-    df_count = hour_count.rename_axis("Datetime").reset_index(name="Frequency")
-    df_count["Date"] = df_count["Datetime"].dt.date
-    df_count["Hour"] = df_count["Datetime"].dt.hour
-    df_count["Day"] = df_count["Datetime"].dt.weekday
-    df_count["Month"] = df_count["Datetime"].dt.month
-    df_count["Year"] = df_count["Datetime"].dt.year
-    df_count = df_count.drop(["Datetime"], axis=1)
-    df_heatmap = df_count[["Day", "Hour", "Frequency"]].groupby(["Day", "Hour"]).sum()
-    matrix = df_heatmap.unstack().fillna(0)
+    matrix = aggregate_analysis(df, "Viewing Heat Map", profile, content_type)
     hours_list = list(range(0,24))
-    days_list = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    days_list = _SHORT_DAYS
 
     sns.set_context("talk")
-    fig, ax = plt.subplots(figsize=(12,5))
+    fig, ax = _subplots((12, 5))
     ax = sns.heatmap(matrix, linewidths=0.5, ax=ax, yticklabels=days_list, xticklabels=hours_list, cmap="viridis")
-    if profile == "All Profiles":
-        if content_type == "All Types":
-            ax.set_title("Heatmap of Netflix Viewing Activity of All Profiles", fontsize=20, y=1.02)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Heatmap of Netflix Movie Viewing Activity of All Profiles", fontsize=20, y=1.02)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Heatmap of Netflix TV Show Viewing Activity of All Profiles", fontsize=20, y=1.02)
-        else:
-            ax.set_title("Heatmap of Netflix Viewing Activity of All Profiles for '" + title + "'", fontsize=20, y=1.02)
-    else:
-        if content_type == "All Types":
-            ax.set_title("Heatmap of Netflix Viewing Activity of " + profile, fontsize=20, y=1.02)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Heatmap of Netflix Movie Viewing Activity of " + profile, fontsize=20, y=1.02)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Heatmap of Netflix TV Show Viewing Activity of " + profile, fontsize=20, y=1.02)
-        else:
-            ax.set_title("Heatmap of Netflix Viewing Activity of " + profile + " for '" + title + "'",
-                              fontsize=20, y=1.02)
+    ax.set_title(_analysis_title("Viewing Heat Map", profile, content_type, title), fontsize=20, y=1.02)
     ax.set(xlabel="Hour of Day", ylabel="Day of Week")
 
     return fig
@@ -444,24 +632,10 @@ def most_watched_movies_analysis(df: pd.DataFrame, profile: str) -> Figure:
         fig (Figure): matplotlib figure containing results of the analysis
     """
 
-    df = df[df["Type"] == "Movie"]
-    top_movies = df["Name"].value_counts().nlargest(10)
-    amount = len(top_movies)
-    x = np.arange(amount)
-    colors = plt.get_cmap("viridis")
-
-    fig, ax = plt.subplots(figsize=(8, 8))
-    bars = ax.bar(top_movies.index, top_movies.values, color=colors(x / amount))
-    ax.set_xlabel("Movies", fontsize=12, labelpad=1)
-    ax.set_ylabel("Frequency", fontsize=12)
-    ax.tick_params(axis="x", labelsize=8)
-    ax.bar_label(bars, label_type="edge")
-    if profile == "All Profiles":
-        ax.set_title("Most Watched Movies by All Profiles", fontsize=14)
-    else:
-        ax.set_title("Most Watched Movies by " + profile, fontsize=14)
+    data = aggregate_analysis(df, "Most Watched Movies", profile, "All Types")
+    chart_title = _analysis_title("Most Watched Movies", profile, "All Types", "All Titles")
 
-    return fig
+    return _bar_chart(data, "Most Watched Movies", chart_title, figsize=(8, 8), label_rotation=0)
 
 
 def most_watched_shows_analysis(df: pd.DataFrame, profile: str) -> Figure:
@@ -476,25 +650,10 @@ def most_watched_shows_analysis(df: pd.DataFrame, profile: str) -> Figure:
         fig (Figure): matplotlib figure containing results of the analysis
     """
 
-    df = df[df["Type"] == "TV Show"]
-    top_shows = df["Name"].value_counts().nlargest(10)
-    amount = len(top_shows)
-    x = np.arange(amount)
-    colors = plt.get_cmap("viridis")
-
-    fig, ax = plt.subplots(figsize=(8, 8))
-    bars = ax.bar(top_shows.index, top_shows.values, color=colors(x / amount))
-    ax.set_xlabel("Shows", fontsize=12, labelpad=1)
-    ax.set_ylabel("Frequency", fontsize=12)
-    ax.tick_params(axis="x", labelsize=8)
-    ax.bar_label(bars, label_type="edge")
+    data = aggregate_analysis(df, "Most Watched Shows", profile, "All Types")
+    chart_title = _analysis_title("Most Watched Shows", profile, "All Types", "All Titles")
 
-    if profile == "All Profiles":
-        ax.set_title("Most Watched TV Shows by All Profiles", fontsize=14)
-    else:
-        ax.set_title("Most Watched TV Shows by " + profile, fontsize=14)
-    
-    return fig
+    return _bar_chart(data, "Most Watched Shows", chart_title, figsize=(8, 8), label_rotation=0)
 
 
 def most_watched_episodes_analysis(df: pd.DataFrame, profile: str, title: str) -> Figure:
@@ -510,23 +669,10 @@ def most_watched_episodes_analysis(df: pd.DataFrame, profile: str, title: str) -
         fig (Figure): matplotlib figure containing results of the analysis
     """
 
-    top_episodes = df["Episode"].value_counts().nlargest(10)
-    amount = len(top_episodes)
-    x = np.arange(amount)
-    colors = plt.get_cmap("viridis")
+    data = aggregate_analysis(df, "Most Watched Episodes", profile, "All Types")
+    chart_title = _analysis_title("Most Watched Episodes", profile, "All Types", title)
 
-    fig, ax = plt.subplots(figsize=(8, 8))
-    bars = ax.bar(top_episodes.index, top_episodes.values, color=colors(x / amount))
-    ax.set_xlabel("Episodes", fontsize=12, labelpad=1)
-    ax.set_ylabel("Frequency", fontsize=12)
-    ax.tick_params(axis="x", labelrotation=25, labelsize=8)
-    ax.bar_label(bars, label_type="edge")
-    if profile == "All Profiles":
-        ax.set_title("Most Watched Episodes of '" + title + "' by All Profiles", fontsize=14)
-    else:
-        ax.set_title("Most Watched Episodes of '" + title + "' by " + profile, fontsize=14)
-    
-    return fig
+    return _bar_chart(data, "Most Watched Episodes", chart_title, figsize=(8, 8), label_rotation=25)
 
 
 def most_watched_days_analysis(df: pd.DataFrame, profile: str, content_type: str, title: str) -> Figure:
@@ -543,39 +689,11 @@ def most_watched_days_analysis(df: pd.DataFrame, profile: str, content_type: str
         fig (Figure): matplotlib figure containing results of the analysis
     """
 
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    df["Day"] = pd.Categorical(df["Day"], categories=days, ordered=True)
-    frequency_per_day = df.sort_values("Day")["Day"].value_counts().sort_index()
-    amount = len(frequency_per_day)
-    x = np.arange(amount)
+    data = aggregate_analysis(df, "Most Watched Days", profile, content_type)
+    chart_title = _analysis_title("Most Watched Days", profile, content_type, title)
     colors = plt.get_cmap("winter").reversed()
 
-    fig, ax = plt.subplots(figsize=(8, 8))
-    bars = ax.bar(frequency_per_day.index, frequency_per_day.values, color=colors(x / amount))
-    ax.set_xlabel("Day of Week", fontsize=12, labelpad=1)
-    ax.set_ylabel("Frequency", fontsize=12)
-    ax.tick_params(axis="x", labelrotation=30, labelsize=8)
-    ax.bar_label(bars, label_type="edge")
-    if profile == "All Profiles":
-        if content_type == "All Types":
-            ax.set_title("Most Watched Days by All Profiles", fontsize=14)
-        elif content_type == "Movie":
-            ax.set_title("Most Watched Days for Movies by All Profiles", fontsize=14)
-        elif content_type == "TV Show":
-            ax.set_title("Most Watched Days for TV Shows by All Profiles", fontsize=14)
-        else:
-            ax.set_title("Most Watched Days for '" + title + "' by All Profiles", fontsize=14)
-    else:
-        if content_type == "All Types":
-            ax.set_title("Most Watched Days by " + profile, fontsize=14)
-        elif content_type == "Movie":
-            ax.set_title("Most Watched Days for Movies by " + profile, fontsize=14)
-        elif content_type == "TV Show":
-            ax.set_title("Most Watched Days for TV Shows by " + profile, fontsize=14)
-        else:
-            ax.set_title("Most Watched Days for '" + title + "' by " + profile, fontsize=14)
-    
-    return fig
+    return _bar_chart(data, "Most Watched Days", chart_title, figsize=(8, 8), colors=colors)
 
 
 def duration_analysis(df: pd.DataFrame, profile: str, content_type: str, title: str) -> Figure:
@@ -592,128 +710,983 @@ def duration_analysis(df: pd.DataFrame, profile: str, content_type: str, title:
         fig (Figure): matplotlib figure containing results of the analysis
     """
 
-    thirty_minutes = pd.to_timedelta("0:30:00")
-    one_hour = pd.to_timedelta("1:00:00")
-    hour_and_a_half = pd.to_timedelta("1:30:00")
-    two_hours = pd.to_timedelta("2:00:00")
-    two_and_a_half_hours = pd.to_timedelta("2:30:00")
-    three_hours = pd.to_timedelta("3:00:00")
+    data = aggregate_analysis(df, "Duration", profile, content_type)
+    chart_title = _analysis_title("Duration", profile, content_type, title)
 
-    def categorize_duration(d):
-        category = ""
-        if content_type == "All Types":
-            if d < thirty_minutes:
-                category = "< 0.5 hrs."
-            elif d < one_hour:
-                category = "0.5-1 hrs."
-            elif d < hour_and_a_half:
-                category = "1-1.5 hrs."
-            elif d < two_hours:
-                category = "1.5-2 hrs."
-            elif d < two_and_a_half_hours:
-                category = "2-2.5 hrs."
-            elif d < three_hours:
-                category = "2.5-3 hrs."
-            else:
-                category = "> 3 hrs."
-        elif content_type == "Movie":
-            if d < hour_and_a_half:
-                category = "< 1.5 hrs."
-            elif d < two_hours:
-                category = "1.5-2 hrs."
-            elif d < two_and_a_half_hours:
-                category = "2-2.5 hrs."
-            elif d < three_hours:
-                category = "2.5-3 hrs."
-            else:
-                category = "3 hrs."
-        elif content_type == "TV":
-            if d < thirty_minutes:
-                category = "< 0.5 hrs."
-            elif d < one_hour:
-                category = "0.5-1 hrs."
-            else:
-                category = "> 1 hr."
+    return _bar_chart(data, "Duration", chart_title, figsize=(6, 8))
 
-        return category
 
-    if profile == "All Profiles":
-        df_duration = df[["Profile Name", "Duration"]]
-        df_duration["Duration Category"] = df_duration["Duration"].apply(categorize_duration)
-        profiles = [n for n in {name for name in df_duration["Profile Name"]}]
-        durations = [d for d in {duration for duration in df_duration["Duration Category"]}]
-        duration_values = []
-
-        fig, ax = plt.subplots(figsize=(6, 8))
-        for duration in durations:
-            values = []
-            for profile in profiles:
-                temp_durations = df_duration[df_duration["Duration Category"] == duration]
-                temp_data = temp_durations[temp_durations["Profile Name"] == profile]
-                try:
-                    values.append(temp_data["Duration Category"].value_counts().values[0])
-                except IndexError:
-                    values.append(0)
-            duration_values.append(values)
-        for i in range(len(duration_values)):
-            if i == 0:
-                ax.bar(profiles, duration_values[i], label=durations[i])
-            else:
-                ax.bar(profiles, duration_values[i], bottom=duration_values[i - 1], label=durations[i])
-        ax.set_xlabel("Profiles", fontsize=12, labelpad=1)
-        ax.set_ylabel("Frequency", fontsize=12)
-        ax.tick_params(axis="x", labelrotation=30, labelsize=8)
-        if content_type == "All Types":
-            ax.set_title("Duration of Content All Profiles Watched on Netflix", fontsize=14)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Duration of Movies All Profiles Watched on Netflix", fontsize=14)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Duration of TV Shows All Profiles Watched on Netflix", fontsize=14)
-        else:
-            ax.set_title("Duration of '" + title + "' All Profiles Watched on Netflix", fontsize=14)
-        ax.legend()
-        return fig
-    else:
-        df_duration = df[["Duration"]]
-        df_duration["Duration Category"] = df_duration["Duration"].apply(categorize_duration)
-        durations_count = df_duration["Duration Category"].value_counts()
-        amount = len(durations_count)
-        x = np.arange(amount)
-        colors = plt.get_cmap("viridis")
+def trends_analysis(df: pd.DataFrame, profile: str, content_type: str, title: str, daily: pd.DataFrame = None, trends: pd.DataFrame = None) -> Figure:
+    """
+    Conducts analysis based on rolling watch time, sessions and year-over-year totals.
 
-        fig, ax = plt.subplots(figsize=(6, 8))
-        bars = ax.bar(durations_count.index, durations_count.values, color=colors(x / amount))
-        ax.set_xlabel("Duration", fontsize=12, labelpad=1)
-        ax.set_ylabel("Frequency", fontsize=12)
-        ax.tick_params(axis="x", labelrotation=30, labelsize=8)
-        ax.bar_label(bars, label_type="edge")
-        if content_type == "All Types":
-            ax.set_title("Duration of Content " + profile + " Watched on Netflix", fontsize=14)
-        elif content_type == "Movie" and title == "All Titles":
-            ax.set_title("Duration of Movies " + profile + " Watched on Netflix", fontsize=14)
-        elif content_type == "TV Show" and title == "All Titles":
-            ax.set_title("Duration of TV Shows " + profile + " Watched on Netflix", fontsize=14)
-        else:
-            ax.set_title("Duration of '" + title + "' Watched By " + profile, fontsize=14)
-        
+    Parameters:
+        df (pd.DataFrame): viewing data
+        profile (str): chosen profile(s) to analyze
+        content_type (str): chosen types of content to analyze
+        title (str): chosen title(s) to analyze
+        daily (pd.DataFrame): daily activity of df kept from an earlier call, so the raw rows are not read again
+        trends (pd.DataFrame): rolling trends of daily kept from an earlier call
+
+    Returns:
+        fig (Figure): matplotlib figure containing results of the analysis
+    """
+
+    if daily is None:
+        daily = aggregate_analysis(df, "Trends", profile, content_type)
+    chart_title = _analysis_title("Trends", profile, content_type, title)
+    if daily.empty:
+        fig, ax = _subplots((10, 12))
+        ax.text(0.5, 0.5, _NO_ACTIVITY_MESSAGE, ha="center", va="center", fontsize=12)
+        ax.set_axis_off()
+        ax.set_title(chart_title, fontsize=14)
         return fig
 
+    if trends is None:
+        trends = rolling_trends(daily)
+    yearly = year_over_year(daily)
+
+    fig, axes = _subplots((10, 12), nrows=3)
+    for ax, metric in zip(axes, _TREND_METRICS):
+        lines, line_title = _trend_lines(trends, metric)
+        ax.set_title(line_title, fontsize=12)
+        ax.plot(lines.index, lines.to_numpy(), label=list(lines.columns))
+        ax.set_ylabel(metric, fontsize=12)
+        ax.tick_params(axis="x", labelsize=8)
+        ax.legend()
 
-def _drop_unnecessary_data(df: pd.DataFrame) -> pd.DataFrame:
+    colors = plt.get_cmap("viridis")
+    years = [f"{year} (partial)" if partial else str(year) for year, partial in zip(yearly.index, yearly["Partial Year"])]
+    bars = axes[2].bar(years, yearly["Watch Hours"], color=colors(np.arange(len(yearly)) / len(yearly)))
+    changes = ["" if pd.isna(change) else f"{change:+.0f}%" for change in yearly["Watch Hours Change (%)"]]
+    axes[2].bar_label(bars, labels=changes, label_type="edge")
+    axes[2].set_xlabel("Year", fontsize=12, labelpad=1)
+    axes[2].set_ylabel("Watch Hours", fontsize=12)
+    axes[2].set_title("Year-Over-Year Watch Hours", fontsize=12)
+    fig.suptitle(chart_title, fontsize=14)
+    fig.tight_layout()
+
+    return fig
+
+
+def daily_activity(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Drops unnecessary columns within the dataframe.
+    Aggregates viewing data into daily watch hours and sessions per profile.
 
     Parameters:
         df (pd.DataFrame): viewing data
 
     Returns:
-        pd.DataFrame: updated viewing data with unnecessary columns dropped
+        pd.DataFrame: daily totals indexed by every date in range, with (metric, profile) columns
     """
 
-    df = df[df["Supplemental Video Type"].isna()]
-    df["duration_minutes"] = df["Duration"].str.split(":").apply(lambda x: int(x[0]) * 60 + int(x[1]))
-    df = df[df["duration_minutes"] >= 5]
-    df = df.drop(
-        ["Attributes", "Supplemental Video Type", "Bookmark", "Latest Bookmark", "duration_minutes"], axis=1)
+    sessions = pd.DataFrame({
+        "Date": df["Date"],
+        "Profile Name": df["Profile Name"],
+        "Watch Hours": df["Duration"].dt.total_seconds() / 3600,
+        "Sessions": 1,
+    })
+
+    return _daily_pivot(sessions)
+
+
+def update_daily_activity(daily: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds newly arrived viewing data to existing daily activity without re-reading older rows.
+
+    Parameters:
+        daily (pd.DataFrame): daily activity from daily_activity
+        df (pd.DataFrame): viewing data that is not yet part of daily
+
+    Returns:
+        pd.DataFrame: updated daily activity
+    """
+
+    if df.empty:
+        return daily
+
+    # Profiles first seen in the new data have no earlier days to add to
+    combined = daily.add(daily_activity(df), fill_value=0).fillna(0)
+
+    return _fill_days(combined)
+
+
+def extend_trends(daily: pd.DataFrame, trends: pd.DataFrame, df: pd.DataFrame, since: pd.Timestamp) -> tuple:
+    """
+    Brings kept daily activity and rolling trends up to date with a newer export of the same selection.
+
+    Parameters:
+        daily (pd.DataFrame): daily activity from daily_activity
+        trends (pd.DataFrame): rolling trends of daily
+        df (pd.DataFrame): viewing data of the newer export from since onward
+        since (pd.Timestamp): first day that may have changed, usually the last day the kept data covered
+
+    Returns:
+        tuple: updated daily activity and rolling trends
+    """
+
+    # The last known day may have been exported part way through, so it is recounted from the new rows
+    before = since - pd.Timedelta(days=1)
+    daily = update_daily_activity(daily.loc[:before], df)
+    trends = rolling_trends(daily, previous=trends.loc[:before])
+
+    return daily, trends
+
+
+def rolling_trends(daily: pd.DataFrame, previous: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Computes rolling sums of daily activity over each trend window.
+
+    Parameters:
+        daily (pd.DataFrame): daily activity from daily_activity
+        previous (pd.DataFrame): trends computed before daily was updated, so only the days after them are recomputed
+
+    Returns:
+        pd.DataFrame: rolling sums indexed by date, with (window, metric, profile) columns
+    """
+
+    if previous is None or previous.empty:
+        return _rolling_sums(daily)
+
+    # Days from the last known one onward may have changed, and each needs the longest window behind it
+    last = previous.index.max()
+    tail = daily.loc[last - pd.Timedelta(days=max(_TREND_WINDOWS) - 1):]
+    fresh = _rolling_sums(tail).loc[last:]
+    trends = pd.concat([previous.loc[:last - pd.Timedelta(days=1)], fresh])
+
+    return trends.reindex(columns=fresh.columns).fillna(0)
+
+
+def year_over_year(daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Totals daily activity per calendar year and compares each year with the same days of the year before.
+
+    Parameters:
+        daily (pd.DataFrame): daily activity from daily_activity
+
+    Returns:
+        pd.DataFrame: yearly totals of each metric, their percentage change and whether the data covers only part of the year, indexed by year
+    """
+
+    totals = daily.T.groupby(level="Metric").sum().T[list(_TREND_METRICS)]
+    first, last = totals.index.min(), totals.index.max()
+    yearly = totals.groupby(totals.index.year).sum()
+    yearly.index.name = "Year"
+
+    # Exports start and end part way through a year, so each year is only compared over the days both years cover
+    year = pd.DateOffset(years=1)
+    changes = pd.DataFrame(np.nan, index=yearly.index, columns=[metric + " Change (%)" for metric in _TREND_METRICS])
+    for current in yearly.index[1:]:
+        start = max(pd.Timestamp(current, 1, 1), first + year)
+        end = min(pd.Timestamp(current, 12, 31), last)
+        if start > end:
+            continue
+        before = totals.loc[start - year:end - year].sum()
+        after = totals.loc[start:end].sum()
+        changes.loc[current] = ((after / before.where(before > 0) - 1) * 100).to_numpy()
+
+    yearly = yearly.join(changes)
+    starts_late = first.dayofyear > 1
+    ends_early = not last.is_year_end
+    yearly["Partial Year"] = ((yearly.index == first.year) & starts_late) | ((yearly.index == last.year) & ends_early)
+
+    return yearly
+
+
+def summarize_data(df: pd.DataFrame) -> dict:
+    """
+    Pre-aggregates viewing data into the tables every analysis is computed from.
+
+    Parameters:
+        df (pd.DataFrame): viewing data separated by type of content
+
+    Returns:
+        dict: summary tables keyed by name, each counting viewings per profile, type, title and more dimensions
+    """
+
+    sessions = df[_SUMMARY_DIMENSIONS + ["Date"]]
+    sessions["Watch Hours"] = df["Duration"].dt.total_seconds() / 3600
+    daily = sessions.groupby(_SUMMARY_DIMENSIONS + ["Date"]).agg(
+        **{"Sessions": ("Watch Hours", "size"), "Watch Hours": ("Watch Hours", "sum")}).reset_index()
+
+    # Every duration category boundary is a multiple of thirty minutes, so half hour buckets keep them exact
+    durations = df[_SUMMARY_DIMENSIONS]
+    durations["Duration Bucket"] = (df["Duration"] // pd.Timedelta(minutes=30)).clip(upper=6)
+
+    # The heat map only needs the day of week and hour of each viewing, and each distinct start hour is parsed once
+    codes, start_times = pd.factorize(df["Start Time"])
+    start_hours = _start_hours(pd.Index(start_times))
+    hours = df[_SUMMARY_DIMENSIONS].assign(Day=start_hours.weekday[codes], Hour=start_hours.hour[codes])
+
+    # Grouping sorts every table by profile, type and title, which filter_summary relies on
+    return {
+        "daily": daily,
+        "hourly": _tally(hours, "Day", "Hour"),
+        "countries": _tally(df, "Country"),
+        "devices": _tally(df, "Device Type"),
+        "durations": _tally(durations, "Duration Bucket"),
+        "titles": _tally(df, "Episode"),
+    }
+
+
+def export_summary(df: pd.DataFrame, path: str, time_zone: str) -> None:
+    """
+    Writes a versioned summary bundle of Parquet files that analyses can run from without the raw data.
+
+    Parameters:
+        df (pd.DataFrame): viewing data separated by type of content
+        path (str): folder to write the bundle to
+        time_zone (str): time zone the viewing data was converted to, which the daily and hourly tables depend on
+    """
+
+    tables = summarize_data(df)
+    os.makedirs(path, exist_ok=True)
+    for name, table in tables.items():
+        table.to_parquet(os.path.join(path, name + ".parquet"), index=False)
+    with open(os.path.join(path, "manifest.json"), "w") as manifest_file:
+        json.dump({"version": _SUMMARY_VERSION, "time_zone": time_zone, "tables": list(tables)}, manifest_file)
+
+
+def load_summary(path: str) -> dict:
+    """
+    Reads a summary bundle written by export_summary.
+
+    Parameters:
+        path (str): folder containing the bundle
+
+    Returns:
+        dict: summary tables keyed by name
+    """
+
+    manifest = _read_manifest(path)
+
+    return {name: pd.read_parquet(os.path.join(path, name + ".parquet")) for name in manifest["tables"]}
+
+
+def summary_time_zone(path: str) -> str:
+    """
+    Reads the time zone a summary bundle was exported in.
+
+    Parameters:
+        path (str): folder containing the bundle
+
+    Returns:
+        str: time zone of the dates and hours in the bundle
+    """
+
+    return _read_manifest(path)["time_zone"]
+
+
+def filter_summary(bundle: dict, profile: str, content_type: str, title: str) -> dict:
+    """
+    Narrows every table of a summary bundle to the chosen filters.
+
+    Parameters:
+        bundle (dict): summary tables from load_summary
+        profile (str): chosen profile(s) to analyze
+        content_type (str): chosen types of content to analyze
+        title (str): chosen title(s) to analyze
+
+    Returns:
+        dict: summary tables matching the filters
+    """
+
+    filtered = {}
+    for name, table in bundle.items():
+        # Tables are sorted by the filter columns, so leading filters narrow a contiguous slice
+        start, stop = 0, len(table)
+        mask = None
+        for column, value in zip(_FILTER_COLUMNS, (profile, content_type, title)):
+            if value in _UNFILTERED:
+                if mask is None:
+                    mask = np.ones(stop - start, dtype=bool)
+            elif mask is None:
+                values = table[column].to_numpy()[start:stop]
+                start, stop = start + np.searchsorted(values, value, "left"), start + np.searchsorted(values, value, "right")
+            else:
+                mask &= table[column].to_numpy()[start:stop] == value
+        table = table.iloc[start:stop]
+        filtered[name] = table if mask is None or mask.all() else table[mask]
+
+    return filtered
+
+
+def release_figure(figure: Figure) -> None:
+    """
+    Returns a figure to the pool once it has been displayed or exported, so later analyses can draw on it.
+
+    Parameters:
+        figure (Figure): matplotlib figure returned by an analysis
+    """
+
+    # Streamlit sessions run in separate threads that share the pool
+    with _FIGURE_POOL_LOCK:
+        free = _FIGURE_POOL.setdefault(_figure_key(figure.get_size_inches()), [])
+        if len(free) < _FIGURE_POOL_LIMIT and all(pooled is not figure for pooled in free):
+            free.append(figure)
+
+
+def _drop_unnecessary_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drops unnecessary columns within the dataframe.
+
+    Parameters:
+        df (pd.DataFrame): viewing data
+
+    Returns:
+        pd.DataFrame: updated viewing data with unnecessary columns dropped
+    """
+
+    df = df[df["Supplemental Video Type"].isna()]
+    df["duration_minutes"] = df["Duration"].str.split(":").apply(lambda x: int(x[0]) * 60 + int(x[1]))
+    df = df[df["duration_minutes"] >= 5]
+    df = df.drop(
+        ["Attributes", "Supplemental Video Type", "Bookmark", "Latest Bookmark", "duration_minutes"], axis=1)
+
+    return df
+
+
+def _analysis_title(analysis: str, profile: str, content_type: str, title: str) -> str:
+    """
+    Builds the chart title of an analysis from the chosen filters.
+
+    Parameters:
+        analysis (str): chosen analysis option
+        profile (str): chosen profile(s) to analyze
+        content_type (str): chosen types of content to analyze
+        title (str): chosen title(s) to analyze
+
+    Returns:
+        str: chart title
+    """
+
+    templates = _TITLE_TEMPLATES[analysis]
+    if content_type == "All Types":
+        key = "All Types"
+    elif content_type in ("Movie", "TV Show") and (title == "All Titles" or analysis == "Most Watched Days"):
+        key = content_type
+    elif profile != "All Profiles" and "profile title" in templates:
+        key = "profile title"
+    else:
+        key = "title"
+
+    return templates.get(key, templates["All Types"]).format(who=profile, title=title)
+
+
+def _count_by_profile(df: pd.DataFrame, column: str, profile: str) -> pd.Series | pd.DataFrame:
+    """
+    Counts viewings per value of a column, split by profile when all profiles are chosen.
+
+    Parameters:
+        df (pd.DataFrame): viewing data
+        column (str): column to count values of
+        profile (str): chosen profile(s) to analyze
+
+    Returns:
+        pd.Series | pd.DataFrame: counts per value, or a profile by value table for all profiles
+    """
+
+    if profile == "All Profiles":
+        return pd.crosstab(df["Profile Name"], df[column])
+    return _rank_counts(df[column].value_counts())
+
+
+def _rank_counts(counts: pd.Series) -> pd.Series:
+    """
+    Orders counts from most to least frequent, breaking ties alphabetically so raw data and summaries agree.
+
+    Parameters:
+        counts (pd.Series): counts per value
+
+    Returns:
+        pd.Series: counts, most frequent first
+    """
+
+    return counts.sort_index().sort_values(ascending=False, kind="stable")
+
+
+def _top_ten(counts: pd.Series) -> pd.Series:
+    """
+    Keeps the ten most frequent values.
+
+    Parameters:
+        counts (pd.Series): counts per value
+
+    Returns:
+        pd.Series: ten highest counts, most frequent first
+    """
+
+    return _rank_counts(counts).head(10)
+
+
+def _rollup_column(df: pd.DataFrame, column: str, rollup: bool) -> tuple:
+    """
+    Picks the column to count, normalizing raw device or country names when a family rollup is asked for.
+
+    Parameters:
+        df (pd.DataFrame): viewing data or summary table
+        column (str): raw column, either "Device Type" or "Country"
+        rollup (bool): count families instead of raw names
+
+    Returns:
+        tuple: data holding the column to count and the name of that column
+    """
+
+    if not rollup:
+        return df, column
+
+    family_column = _FAMILY_COLUMNS[column]
+    if family_column not in df:
+        df = df.assign(**{family_column: _normalize_column(df[column], column)})
+
+    return df, family_column
+
+
+def _normalize_column(values: pd.Series, column: str) -> pd.Series:
+    """
+    Maps raw device or country names to their families, looking each distinct name up once.
+
+    Parameters:
+        values (pd.Series): raw device or country names
+        column (str): raw column, either "Device Type" or "Country"
+
+    Returns:
+        pd.Series: interned family of each row
+    """
+
+    lookup = _device_family if column == "Device Type" else _country_code
+    codes, uniques = pd.factorize(values)
+
+    # Missing names are coded -1, which picks the trailing None
+    families = np.array([lookup(value) for value in uniques] + [None], dtype=object)
+
+    return pd.Series(families[codes], index=values.index, name=_FAMILY_COLUMNS[column])
+
+
+@lru_cache(maxsize=4096)
+def _device_family(device: str) -> str:
+    """
+    Finds the family of a raw device name from the device rules.
+
+    Parameters:
+        device (str): raw device name
+
+    Returns:
+        str: device family
+    """
+
+    for pattern, family in _DEVICE_RULES:
+        if pattern.search(device):
+            return family
+
+    return _DEFAULT_DEVICE_FAMILY
+
+
+@lru_cache(maxsize=4096)
+def _country_code(country: str) -> str:
+    """
+    Finds the ISO code of a raw country name, keeping the name when it is not recognized.
+
+    Parameters:
+        country (str): raw country name
+
+    Returns:
+        str: interned two letter ISO country code
+    """
+
+    match = _COUNTRY_PREFIX.match(country)
+    if match:
+        return sys.intern(match.group(1))
+
+    return sys.intern(_COUNTRY_CODES.get(country.strip(), country.strip()))
+
+
+def _daily_counts(by_date: pd.Series) -> pd.Series:
+    """
+    Orders viewing counts per calendar day, including days without any viewing.
+
+    Parameters:
+        by_date (pd.Series): viewing count indexed by date
+
+    Returns:
+        pd.Series: viewing count indexed by every date in range
+    """
+
+    by_date = by_date.sort_index()
+    by_date.index = pd.DatetimeIndex(by_date.index)
+    idx = pd.date_range(min(by_date.index), max(by_date.index))
+
+    return by_date.reindex(idx, fill_value=0)
+
+
+def _hourly_matrix(by_day_hour: pd.Series) -> pd.DataFrame:
+    """
+    Spreads viewing counts over every day of week and hour of day.
+
+    Parameters:
+        by_day_hour (pd.Series): viewing count indexed by day of week and local start hour
+
+    Returns:
+        pd.DataFrame: viewing count with days of week (0 is Monday) as rows and hours as columns
+    """
+
+    idx = pd.MultiIndex.from_product([range(7), range(24)], names=["Day", "Hour"])
+
+    return by_day_hour.reindex(idx, fill_value=0).unstack()
+
+
+def _start_hours(start_times: pd.Index) -> pd.DatetimeIndex:
+    """
+    Parses local start hours written by convert_times.
+
+    Parameters:
+        start_times (pd.Index): distinct local start hours as text
+
+    Returns:
+        pd.DatetimeIndex: local start hours as timestamps
+    """
+
+    return pd.to_datetime(start_times, format="%Y-%m-%d, %H:%M:%S")
+
+
+def _weekday_counts(by_day: pd.Series) -> pd.Series:
+    """
+    Orders viewing counts per day of week from Monday to Sunday.
+
+    Parameters:
+        by_day (pd.Series): viewing count indexed by day name
+
+    Returns:
+        pd.Series: viewing count indexed by every day of week
+    """
+
+    return by_day.reindex(_DAYS, fill_value=0).rename_axis("Day")
+
+
+def _duration_counts(df: pd.DataFrame, profile: str, content_type: str) -> pd.Series | pd.DataFrame:
+    """
+    Counts viewings per duration category, split by profile when all profiles are chosen.
+
+    Parameters:
+        df (pd.DataFrame): viewing data
+        profile (str): chosen profile(s) to analyze
+        content_type (str): chosen types of content to analyze
+
+    Returns:
+        pd.Series | pd.DataFrame: counts per duration category, or a profile by category table for all profiles
+    """
+
+    df_duration = df[["Profile Name", "Duration"]]
+    df_duration["Duration Category"] = _categorize_durations(df_duration["Duration"], content_type)
+
+    return _count_by_profile(df_duration, "Duration Category", profile)
+
+
+def _categorize_durations(durations: pd.Series, content_type: str) -> pd.Series:
+    """
+    Sorts viewing durations into the categories shown for the chosen content type.
+
+    Parameters:
+        durations (pd.Series): viewing durations
+        content_type (str): chosen types of content to analyze
+
+    Returns:
+        pd.Series: duration category of each viewing
+    """
+
+    thirty_minutes = pd.to_timedelta("0:30:00")
+    one_hour = pd.to_timedelta("1:00:00")
+    hour_and_a_half = pd.to_timedelta("1:30:00")
+    two_hours = pd.to_timedelta("2:00:00")
+    two_and_a_half_hours = pd.to_timedelta("2:30:00")
+    three_hours = pd.to_timedelta("3:00:00")
+
+    def categorize_duration(d):
+        category = ""
+        if content_type == "All Types":
+            if d < thirty_minutes:
+                category = "< 0.5 hrs."
+            elif d < one_hour:
+                category = "0.5-1 hrs."
+            elif d < hour_and_a_half:
+                category = "1-1.5 hrs."
+            elif d < two_hours:
+                category = "1.5-2 hrs."
+            elif d < two_and_a_half_hours:
+                category = "2-2.5 hrs."
+            elif d < three_hours:
+                category = "2.5-3 hrs."
+            else:
+                category = "> 3 hrs."
+        elif content_type == "Movie":
+            if d < hour_and_a_half:
+                category = "< 1.5 hrs."
+            elif d < two_hours:
+                category = "1.5-2 hrs."
+            elif d < two_and_a_half_hours:
+                category = "2-2.5 hrs."
+            elif d < three_hours:
+                category = "2.5-3 hrs."
+            else:
+                category = "3 hrs."
+        elif content_type == "TV Show":
+            if d < thirty_minutes:
+                category = "< 0.5 hrs."
+            elif d < one_hour:
+                category = "0.5-1 hrs."
+            else:
+                category = "> 1 hr."
+
+        return category
+
+    return durations.apply(categorize_duration)
+
+
+def _aggregate_summary(bundle: dict, analysis: str, profile: str, content_type: str, rollup: bool = False) -> pd.Series | pd.DataFrame:
+    """
+    Computes the aggregated data behind an analysis from a summary bundle.
+
+    Parameters:
+        bundle (dict): summary tables from load_summary
+        analysis (str): chosen analysis option
+        profile (str): chosen profile(s) to analyze
+        content_type (str): chosen types of content to analyze
+        rollup (bool): count device families and country codes instead of raw device and country names
+
+    Returns:
+        pd.Series | pd.DataFrame: same data aggregate_analysis computes from the raw viewing data
+    """
+
+    daily = bundle["daily"]
+    titles = bundle["titles"]
+
+    if analysis == "Countries":
+        data = _sum_by_profile(*_rollup_column(bundle["countries"], "Country", rollup), profile)
+    elif analysis == "Device Types":
+        data = _sum_by_profile(*_rollup_column(bundle["devices"], "Device Type", rollup), profile)
+    elif analysis == "Viewing Frequency":
+        data = _sum_counts(daily, "Profile Name", "Sessions")
+    elif analysis == "Viewing Activity Timeline":
+        data = _daily_counts(daily.groupby("Date")["Sessions"].sum())
+    elif analysis == "Viewing Heat Map":
+        data = _hourly_matrix(bundle["hourly"].groupby(["Day", "Hour"])["Count"].sum())
+    elif analysis == "Most Watched Movies":
+        data = _top_ten(_sum_counts(titles[titles["Type"] == "Movie"], "Name"))
+    elif analysis == "Most Watched Shows":
+        data = _top_ten(_sum_counts(titles[titles["Type"] == "TV Show"], "Name"))
+    elif analysis == "Most Watched Days":
+        data = _weekday_counts(daily.groupby(daily["Date"].dt.day_name())["Sessions"].sum())
+    elif analysis == "Most Watched Episodes":
+        data = _top_ten(_sum_counts(titles, "Episode"))
+    elif analysis == "Duration":
+        durations = bundle["durations"]
+        bucket_starts = pd.to_timedelta(durations["Duration Bucket"] * 30, unit="min")
+        durations = durations.assign(**{"Duration Category": _categorize_durations(bucket_starts, content_type)})
+        data = _sum_by_profile(durations, "Duration Category", profile)
+    elif analysis == "Trends":
+        data = _daily_pivot(daily[["Date", "Profile Name", "Watch Hours", "Sessions"]])
+
+    return data
+
+
+def _read_manifest(path: str) -> dict:
+    """
+    Reads the manifest of a summary bundle, rejecting bundles written by another version.
+
+    Parameters:
+        path (str): folder containing the bundle
+
+    Returns:
+        dict: bundle version, time zone and table names
+    """
+
+    with open(os.path.join(path, "manifest.json"), "r") as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get("version") != _SUMMARY_VERSION:
+        raise ValueError(f"Unsupported summary bundle version {manifest.get('version')}, expected {_SUMMARY_VERSION}")
+
+    return manifest
+
+
+def _sum_counts(table: pd.DataFrame, column: str, values: str = "Count") -> pd.Series:
+    """
+    Totals pre-aggregated counts per value of a column, most frequent first.
+
+    Parameters:
+        table (pd.DataFrame): summary table
+        column (str): column to total counts of
+        values (str): column holding the counts
+
+    Returns:
+        pd.Series: counts per value
+    """
+
+    return _rank_counts(table.groupby(column)[values].sum().rename("count"))
+
+
+def _sum_by_profile(table: pd.DataFrame, column: str, profile: str) -> pd.Series | pd.DataFrame:
+    """
+    Totals pre-aggregated counts per value of a column, split by profile when all profiles are chosen.
+
+    Parameters:
+        table (pd.DataFrame): summary table
+        column (str): column to total counts of
+        profile (str): chosen profile(s) to analyze
+
+    Returns:
+        pd.Series | pd.DataFrame: counts per value, or a profile by value table for all profiles
+    """
+
+    if profile == "All Profiles":
+        return table.pivot_table(index="Profile Name", columns=column, values="Count", aggfunc="sum", fill_value=0)
+    return _sum_counts(table, column)
+
+
+def _tally(df: pd.DataFrame, *columns: str) -> pd.DataFrame:
+    """
+    Counts viewings per profile, type, title and further columns for a summary bundle.
+
+    Parameters:
+        df (pd.DataFrame): viewing data
+        columns (str): extra columns to count viewings by
+
+    Returns:
+        pd.DataFrame: one row per distinct combination with its count
+    """
+
+    return df.groupby(_SUMMARY_DIMENSIONS + list(columns), dropna=False).size().reset_index(name="Count")
+
+
+def _bar_chart(data: pd.Series | pd.DataFrame, analysis: str, chart_title: str, figsize: tuple, label_rotation: int = 30, colors=None, label_limit: int = _BAR_LABEL_LIMIT) -> Figure:
+    """
+    Draws aggregated data as a bar chart, stacking one segment per category when given a profile by category table.
+
+    Parameters:
+        data (pd.Series | pd.DataFrame): counts per category, or a profile by category table
+        analysis (str): chosen analysis option
+        chart_title (str): title displayed above the chart
+        figsize (tuple): width and height of the figure in inches
+        label_rotation (int): rotation of the category tick labels
+        colors (Colormap): colormap spread across the bars of a single series, viridis by default
+        label_limit (int): largest number of bars drawn as separate labelled rectangles
+
+    Returns:
+        fig (Figure): matplotlib figure containing the chart
+    """
+
+    category_label, value_label = _AXIS_LABELS[analysis]
+    fig, ax = _subplots(figsize)
+
+    if isinstance(data, pd.DataFrame):
+        # Draw every non-empty segment in a single call with bottoms from the running total of each profile
+        values = data.to_numpy()
+        amount, categories = values.shape
+        cycle = plt.rcParams["axes.prop_cycle"].by_key()["color"]
+        category_colors = [cycle[i % len(cycle)] for i in range(categories)]
+        positions = np.repeat(np.arange(amount), categories)
+        bottoms = np.cumsum(values, axis=1) - values
+        filled = values.ravel() > 0
+        segment_colors = np.array(category_colors * amount, dtype=object)[filled]
+        ax.bar(positions[filled], values.ravel()[filled], bottom=bottoms.ravel()[filled], color=list(segment_colors))
+        ax.set_xticks(np.arange(amount), labels=data.index)
+        ax.set_xlabel("Profiles", fontsize=12, labelpad=1)
+        ax.set_ylabel(value_label, fontsize=12)
+        ax.tick_params(axis="x", labelrotation=label_rotation, labelsize=8)
+        ax.legend(handles=[Patch(color=color, label=category) for color, category in zip(category_colors, data.columns)])
+        ax.set_title(chart_title, fontsize=14)
+        return fig
+
+    amount = len(data)
+    if colors is None:
+        colors = plt.get_cmap("viridis")
+    bar_colors = colors(np.arange(amount) / amount)
+    horizontal = analysis in _HORIZONTAL_ANALYSES
+    if amount > label_limit:
+        _bar_collection(ax, data, bar_colors, horizontal)
+    elif horizontal:
+        ax.bar_label(ax.barh(data.index, data.values, color=bar_colors), label_type="edge")
+    else:
+        ax.bar_label(ax.bar(data.index, data.values, color=bar_colors), label_type="edge")
+    if horizontal:
+        ax.set_xlabel(value_label, fontsize=12)
+        ax.set_ylabel(category_label, fontsize=12, labelpad=1)
+        ax.tick_params(axis="both", labelsize=8)
+        ax.invert_yaxis()
+    else:
+        ax.set_xlabel(category_label, fontsize=12, labelpad=1)
+        ax.set_ylabel(value_label, fontsize=12)
+        ax.tick_params(axis="x", labelrotation=label_rotation, labelsize=8)
+    ax.set_title(chart_title, fontsize=14)
+
+    return fig
+
+
+def _bar_collection(ax, data: pd.Series, bar_colors, horizontal: bool) -> None:
+    """
+    Draws a long series as one collection of rectangles instead of one patch per bar.
+
+    Parameters:
+        ax (Axes): axes to draw on
+        data (pd.Series): counts per category or per day
+        bar_colors: color of each bar
+        horizontal (bool): whether bars grow along the x axis
+    """
+
+    dates = isinstance(data.index, pd.DatetimeIndex)
+    positions = mdates.date2num(data.index) if dates else np.arange(len(data))
+    values = data.to_numpy(dtype=float)
+
+    # Empty bars would not be visible, so only the filled ones become polygons
+    filled = values != 0
+    positions, values = positions[filled], values[filled]
+    left, right, base = positions - 0.4, positions + 0.4, np.zeros_like(values)
+    corners = np.stack([np.column_stack(pair) for pair in [(left, base), (left, values), (right, values), (right, base)]], axis=1)
+    if horizontal:
+        corners = corners[:, :, ::-1]
+    ax.add_collection(PolyCollection(corners, facecolors=np.asarray(bar_colors)[filled], edgecolors="none"))
+
+    category_axis, value_axis = (ax.yaxis, ax.xaxis) if horizontal else (ax.xaxis, ax.yaxis)
+    if dates:
+        category_axis.axis_date()
+    else:
+        category_axis.set_ticks(np.arange(len(data)), labels=data.index)
+    ax.autoscale_view()
+    if horizontal:
+        ax.set_xlim(left=0)
+    else:
+        ax.set_ylim(bottom=0)
+
+
+def _fold_categories(table: pd.DataFrame, limit: int) -> pd.DataFrame:
+    """
+    Keeps the most frequent categories of a profile by category table and sums the rest into "Other".
+
+    Parameters:
+        table (pd.DataFrame): profile by category counts
+        limit (int): largest number of categories kept, including "Other"
+
+    Returns:
+        pd.DataFrame: profile by category counts with at most limit categories
+    """
+
+    if table.shape[1] <= limit:
+        return table
+
+    totals = table.sum().sort_values(ascending=False, kind="stable")
+    kept = [category for category in table.columns if category in set(totals.index[:limit - 1])]
+    folded = table[kept]
+    folded["Other"] = table.drop(columns=kept).sum(axis=1)
+
+    return folded
+
+
+def _subplots(figsize: tuple, nrows: int = 1) -> tuple:
+    """
+    Creates a figure with stacked axes, reusing a released figure of the same size when available.
+
+    Parameters:
+        figsize (tuple): width and height of the figure in inches
+        nrows (int): number of axes stacked vertically
+
+    Returns:
+        tuple: figure and its axes, or an array of axes when nrows is above one
+    """
+
+    with _FIGURE_POOL_LOCK:
+        free = _FIGURE_POOL.get(_figure_key(figsize))
+        fig = free.pop() if free else None
+    if fig is None:
+        fig = Figure(figsize=figsize)
+    else:
+        fig.clear()
+    ax = fig.subplots(nrows)
+
+    return fig, ax
+
+
+def _figure_key(figsize) -> tuple:
+    """
+    Normalizes a figure size so requested and measured sizes share a pool entry.
+
+    Parameters:
+        figsize: width and height of the figure in inches
+
+    Returns:
+        tuple: width and height as floats
+    """
+
+    return tuple(float(size) for size in figsize)
+
+
+def _daily_pivot(sessions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Totals watch hours and sessions per day and profile.
+
+    Parameters:
+        sessions (pd.DataFrame): date, profile name, watch hours and session count of viewings
+
+    Returns:
+        pd.DataFrame: daily totals indexed by every date in range, with (metric, profile) columns
+    """
+
+    daily = sessions.groupby(["Date", "Profile Name"])[list(_TREND_METRICS)].sum().unstack("Profile Name", fill_value=0)
+    daily.columns.names = ["Metric", "Profile Name"]
+
+    return _fill_days(daily.sort_index(axis=1))
+
+
+def _fill_days(daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fills in the days without any viewing so rolling windows count calendar days.
+
+    Parameters:
+        daily (pd.DataFrame): daily totals indexed by date
+
+    Returns:
+        pd.DataFrame: daily totals indexed by every date in range
+    """
+
+    if daily.empty:
+        return daily
+
+    idx = pd.date_range(min(daily.index), max(daily.index), name="Date")
+
+    return daily.reindex(idx, fill_value=0)
+
+
+def _trend_lines(trends: pd.DataFrame, metric: str) -> tuple:
+    """
+    Picks the rolling lines drawn for a metric, comparing profiles over a month or the windows of a single profile.
+
+    Parameters:
+        trends (pd.DataFrame): rolling trends from rolling_trends
+        metric (str): metric to draw
+
+    Returns:
+        tuple: lines indexed by date with one column per profile or window, and their title
+    """
+
+    if trends.columns.unique("Profile Name").size > 1:
+        return trends["30-Day"][metric], "30-Day Rolling " + metric
+
+    lines = pd.DataFrame({window: trends[window][metric].sum(axis=1) for window in trends.columns.unique("Window")})
+    lines.columns.name = "Window"
+
+    return lines, "Rolling " + metric
+
+
+def _rolling_sums(daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sums daily activity over each trend window.
+
+    Parameters:
+        daily (pd.DataFrame): daily totals indexed by every date in range
+
+    Returns:
+        pd.DataFrame: rolling sums with (window, metric, profile) columns
+    """
+
+    trends = pd.concat({f"{window}-Day": daily.rolling(window, min_periods=1).sum() for window in _TREND_WINDOWS}, axis=1)
+    trends.columns.names = ["Window", "Metric", "Profile Name"]
 
-    return df
\ No newline at end of file
+    return trends
@@ -0,0 +1,45 @@
+"""
+Shared fixtures for the analysis tests.
+"""
+
+# Import necessary libraries
+import pandas as pd
+import pytest
+from helpers import make_viewing_activity, prepare, SAMPLE_FILE
+
+
+def pytest_addoption(parser):
+    parser.addoption("--update-golden", action="store_true", help="rewrite the stored golden outputs")
+    parser.addoption("--run-performance", action="store_true", help="check the timing budgets, which are only meaningful on a quiet machine")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "performance: timing budgets measured on large synthetic data")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-performance"):
+        return
+    skip = pytest.mark.skip(reason="timing budgets run only with --run-performance")
+    for item in items:
+        if "performance" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def sample_data() -> pd.DataFrame:
+    return prepare(SAMPLE_FILE)
+
+
+@pytest.fixture(scope="session")
+def synthetic_data(tmp_path_factory) -> pd.DataFrame:
+    path = tmp_path_factory.mktemp("synthetic") / "viewing_activity.csv"
+    make_viewing_activity(2000, seed=7, days=120).to_csv(path, index=False)
+    return prepare(path)
+
+
+@pytest.fixture(scope="session")
+def multi_year_data(tmp_path_factory) -> pd.DataFrame:
+    path = tmp_path_factory.mktemp("multi_year") / "viewing_activity.csv"
+    make_viewing_activity(20_000, seed=3).to_csv(path, index=False)
+    return prepare(path)
@@ -0,0 +1,80 @@
+"""
+Synthetic viewing activity and data preparation shared by the analysis tests.
+"""
+
+# Import necessary libraries
+import sys
+import os
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import viewing_activity_analysis as netflix
+
+
+SAMPLE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "viewing_activity.csv")
+TIME_ZONE = "America/New_York"
+
+PROFILES = ["Alex", "Jordan", "Kids", "Sam"]
+SHOWS = ["Stranger Things", "The Office (U.S.)", "Dark", "The Crown", "Narcos", "Ozark"]
+MOVIES = ["Roma", "The Irishman", "Bird Box", "Marriage Story", "Okja", "Klaus", "Extraction"]
+DEVICES = ["Apple iPhone 12 Pro", "Samsung 2020 UHD TV", "Chrome PC (Cadmium)", "Sony PS5", "Apple iPad Air 4"]
+COUNTRIES = ["US (United States)", "CA (Canada)", "GB (United Kingdom)", "MX (Mexico)"]
+
+
+def make_viewing_activity(rows: int, seed: int = 0, days: int = 3 * 365) -> pd.DataFrame:
+    """
+    Generates viewing activity in the layout of a Netflix ViewingActivity.csv export.
+
+    Parameters:
+        rows (int): number of viewings to generate
+        seed (int): random seed
+        days (int): number of days the viewings are spread over
+
+    Returns:
+        pd.DataFrame: raw viewing activity
+    """
+
+    rng = np.random.default_rng(seed)
+    is_show = rng.random(rows) < 0.7
+    shows = rng.choice(SHOWS, rows)
+    seasons = rng.integers(1, 5, rows)
+    episodes = rng.integers(1, 11, rows)
+    titles = np.where(
+        is_show,
+        [f"{show}: Season {season}: Chapter {episode} (Episode {episode})" for show, season, episode in zip(shows, seasons, episodes)],
+        rng.choice(MOVIES, rows))
+
+    # Movies run longer than episodes, and a few rows are too short to count as viewings
+    seconds = np.where(is_show, rng.integers(60, 75 * 60, rows), rng.integers(10 * 60, 200 * 60, rows))
+    durations = [f"{s // 3600}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in seconds]
+    start = pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, days * 86400, rows), unit="s")
+    supplemental = np.where(rng.random(rows) < 0.05, "TRAILER", None)
+
+    return pd.DataFrame({
+        "Profile Name": rng.choice(PROFILES, rows),
+        "Start Time": start.strftime("%Y-%m-%d %H:%M:%S"),
+        "Duration": durations,
+        "Attributes": None,
+        "Title": titles,
+        "Supplemental Video Type": supplemental,
+        "Device Type": rng.choice(DEVICES, rows),
+        "Bookmark": durations,
+        "Latest Bookmark": "Not latest view",
+        "Country": rng.choice(COUNTRIES, rows),
+    })
+
+
+def prepare(data_file) -> pd.DataFrame:
+    """
+    Runs the same preparation steps as the web application.
+
+    Parameters:
+        data_file: path to CSV file
+
+    Returns:
+        pd.DataFrame: viewing data separated by type of content
+    """
+
+    df = netflix.load_data(data_file)
+    df = netflix.convert_times(df, TIME_ZONE)
+    return netflix.separate_types_of_content(df)
@@ -0,0 +1,329 @@
+"""
+Checks the numbers behind every analysis against stored golden outputs, and how long computing them takes.
+"""
+
+# Import necessary libraries
+import json
+import os
+import time
+import pandas as pd
+import pytest
+from matplotlib.figure import Figure
+from helpers import make_viewing_activity, prepare, TIME_ZONE
+from src import viewing_activity_analysis as netflix
+
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+
+ANALYSES = ["Viewing Frequency", "Viewing Activity Timeline", "Viewing Heat Map", "Most Watched Days", "Duration", "Most Watched Movies", "Most Watched Shows", "Most Watched Episodes", "Device Types", "Countries", "Trends"]
+
+# Filter combinations (profile, content type, title) checked for each dataset
+CASES = {
+    "sample": [
+        ("All Profiles", "All Types", "All Titles"),
+        ("Charlie", "All Types", "All Titles"),
+        ("All Profiles", "Movie", "All Titles"),
+        ("All Profiles", "TV Show", "All Titles"),
+        ("Charlie", "TV Show", "The Office (U.S.)"),
+    ],
+    "synthetic": [
+        ("All Profiles", "All Types", "All Titles"),
+        ("Jordan", "All Types", "All Titles"),
+        ("All Profiles", "Movie", "All Titles"),
+        ("All Profiles", "TV Show", "All Titles"),
+        ("Sam", "TV Show", "Dark"),
+    ],
+}
+
+# Seconds allowed per step on 100,000 synthetic viewings, about twice the fastest measured run
+PERFORMANCE_ROWS = 100_000
+PREPARATION_BUDGETS = {
+    "load_data": 1.6,
+    "convert_times": 7.5,
+    "separate_types_of_content": 0.4,
+    "build_filter_index": 0.1,
+    "normalize_devices_and_countries": 0.05,
+    "summarize_data": 1.25,
+}
+AGGREGATION_BUDGETS = {analysis: 0.1 for analysis in ANALYSES}
+AGGREGATION_BUDGETS.update({"Viewing Heat Map": 0.45, "Duration": 0.85})
+RENDER_BUDGETS = {analysis: 0.15 for analysis in ANALYSES}
+RENDER_BUDGETS.update({"Viewing Heat Map": 0.8, "Duration": 1.0, "Trends": 0.6})
+
+
+def _label(value) -> str:
+    if isinstance(value, pd.Timestamp):
+        return value.date().isoformat()
+    if isinstance(value, tuple):
+        return " / ".join(_label(part) for part in value)
+    return str(value)
+
+
+def _canonical(data: pd.Series | pd.DataFrame) -> list:
+    """
+    Converts aggregated data to plain JSON values so it can be stored and compared, keeping the order it is drawn in.
+
+    Parameters:
+        data (pd.Series | pd.DataFrame): aggregated data from aggregate_analysis
+
+    Returns:
+        list: [label, value] pairs in order, with table cells labelled by row and column
+    """
+
+    if isinstance(data, pd.DataFrame):
+        data = data.stack(list(range(data.columns.nlevels)), future_stack=True)
+    return [[_label(label), round(float(value), 6)] for label, value in data.items()]
+
+
+def _assert_same(actual: list, expected: list, message: str) -> None:
+    assert [label for label, _ in actual] == [label for label, _ in expected], message
+    assert [value for _, value in actual] == pytest.approx([value for _, value in expected]), message
+
+
+def _case_id(case: tuple, analysis: str) -> str:
+    return " | ".join(case + (analysis,))
+
+
+def _best_time(function, *args, rounds: int = 3) -> float:
+    """
+    Times a call several times and keeps the fastest run, like pytest-benchmark's min statistic.
+
+    Parameters:
+        function: callable to time
+        args: arguments to call it with
+        rounds (int): number of timed calls
+
+    Returns:
+        float: fastest run in seconds
+    """
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@pytest.fixture(scope="session")
+def datasets(sample_data, synthetic_data) -> dict:
+    return {"sample": sample_data, "synthetic": synthetic_data}
+
+
+@pytest.fixture(scope="session")
+def large_data(tmp_path_factory) -> str:
+    path = tmp_path_factory.mktemp("large") / "viewing_activity.csv"
+    make_viewing_activity(PERFORMANCE_ROWS, seed=11).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("dataset", list(CASES))
+def test_aggregates_match_golden(request, datasets, dataset):
+    df = datasets[dataset]
+    index = netflix.build_filter_index(df)
+    actual = {}
+    for case in CASES[dataset]:
+        view = netflix.filter_view(df, index, *case)
+        for analysis in ANALYSES:
+            actual[_case_id(case, analysis)] = _canonical(netflix.aggregate_analysis(view, analysis, case[0], case[1]))
+
+    golden_file = os.path.join(GOLDEN_DIR, dataset + ".json")
+    if request.config.getoption("--update-golden"):
+        # One [label, value] pair per line keeps the files diffable
+        cases = [f" {json.dumps(case_id)}: [\n" + ",\n".join("  " + json.dumps(pair) for pair in actual[case_id]) + "\n ]" for case_id in sorted(actual)]
+        with open(golden_file, "w") as output:
+            output.write("{\n" + ",\n".join(cases) + "\n}\n")
+
+    with open(golden_file, "r") as expected_file:
+        expected = json.load(expected_file)
+    assert actual.keys() == expected.keys()
+    for case_id in expected:
+        _assert_same(actual[case_id], expected[case_id], case_id)
+
+
+@pytest.mark.parametrize("case", CASES["synthetic"], ids=" | ".join)
+def test_summary_bundle_matches_raw_data(tmp_path, synthetic_data, case):
+    netflix.export_summary(synthetic_data, tmp_path, TIME_ZONE)
+    bundle = netflix.filter_summary(netflix.load_summary(tmp_path), *case)
+    view = netflix.filter_view(synthetic_data, netflix.build_filter_index(synthetic_data), *case)
+    for analysis in ANALYSES:
+        expected = _canonical(netflix.aggregate_analysis(view, analysis, case[0], case[1]))
+        _assert_same(_canonical(netflix.aggregate_analysis(bundle, analysis, case[0], case[1])), expected, analysis)
+
+
+def test_ties_ordered_alike_from_raw_data_and_bundle(tmp_path, sample_data):
+    df = sample_data.head(5).assign(**{"Profile Name": ["b", "a", "b", "a", "c"], "Country": ["y", "x", "x", "y", "z"]})
+    netflix.export_summary(df, tmp_path, TIME_ZONE)
+    bundle = netflix.load_summary(tmp_path)
+    assert netflix.summary_time_zone(tmp_path) == TIME_ZONE
+    for analysis, profile in [("Viewing Frequency", "All Profiles"), ("Countries", "b")]:
+        raw = netflix.aggregate_analysis(netflix.filter_view(df, netflix.build_filter_index(df), profile, "All Types", "All Titles"), analysis, profile, "All Types")
+        summarized = netflix.aggregate_analysis(netflix.filter_summary(bundle, profile, "All Types", "All Titles"), analysis, profile, "All Types")
+        assert list(raw.index) == list(summarized.index)
+    assert list(netflix.aggregate_analysis(df, "Viewing Frequency", "All Profiles", "All Types").index) == ["a", "b", "c"]
+
+
+def test_filter_view_matches_boolean_masks(synthetic_data):
+    index = netflix.build_filter_index(synthetic_data)
+    for profile, content_type, title in CASES["synthetic"]:
+        expected = synthetic_data
+        if profile != "All Profiles":
+            expected = expected[expected["Profile Name"] == profile]
+        if content_type != "All Types":
+            expected = expected[expected["Type"] == content_type]
+        if title != "All Titles":
+            expected = expected[expected["Name"] == title]
+        pd.testing.assert_frame_equal(netflix.filter_view(synthetic_data, index, profile, content_type, title), expected)
+
+
+def test_incremental_trends_match_full_recompute(synthetic_data):
+    df = synthetic_data.sort_values("Date")
+    earlier, later = df.iloc[:1500], df.iloc[1500:]
+    daily = netflix.daily_activity(earlier)
+    trends = netflix.rolling_trends(daily)
+
+    updated = netflix.update_daily_activity(daily, later)
+    full = netflix.daily_activity(df)
+    pd.testing.assert_frame_equal(updated, full, check_dtype=False)
+    pd.testing.assert_frame_equal(netflix.rolling_trends(updated, previous=trends), netflix.rolling_trends(full), check_dtype=False)
+
+
+def test_extended_trends_match_full_recompute(synthetic_data):
+    since = synthetic_data["Date"].sort_values().iloc[1000].normalize()
+    # The older export only holds part of its last day
+    earlier = synthetic_data[synthetic_data["Date"] <= since].iloc[::2]
+    daily = netflix.daily_activity(earlier)
+
+    daily, trends = netflix.extend_trends(daily, netflix.rolling_trends(daily), synthetic_data[synthetic_data["Date"] >= since], since)
+    full = netflix.daily_activity(pd.concat([earlier[earlier["Date"] < since], synthetic_data[synthetic_data["Date"] >= since]]))
+    pd.testing.assert_frame_equal(daily, full, check_dtype=False)
+    pd.testing.assert_frame_equal(trends, netflix.rolling_trends(full), check_dtype=False)
+
+
+def test_year_over_year_compares_the_same_days(multi_year_data):
+    daily = netflix.daily_activity(multi_year_data).loc[:"2021-03-15"]
+    yearly = netflix.year_over_year(daily)
+    before, after = daily.loc["2020-01-01":"2020-03-15"], daily.loc["2021-01-01":"2021-03-15"]
+    expected = (after["Watch Hours"].to_numpy().sum() / before["Watch Hours"].to_numpy().sum() - 1) * 100
+    assert yearly.loc[2021, "Watch Hours Change (%)"] == pytest.approx(expected)
+    assert yearly["Partial Year"].tolist() == [True, False, False, True]
+
+
+def test_interactive_trends_of_multi_year_data(multi_year_data):
+    for profile in ["All Profiles", "Sam"]:
+        view = netflix.filter_view(multi_year_data, netflix.build_filter_index(multi_year_data), profile, "All Types", "All Titles")
+        chart = netflix.conduct_analysis(view, "Trends", profile, "All Types", "All Titles", renderer="altair")
+        assert len(chart.to_dict()["vconcat"]) == 3
+
+
+def test_trends_of_empty_selection(sample_data):
+    view = sample_data[sample_data["Profile Name"] == "Nobody"]
+    assert netflix.aggregate_analysis(view, "Trends", "Nobody", "All Types").empty
+    netflix.release_figure(netflix.conduct_analysis(view, "Trends", "Nobody", "All Types", "All Titles"))
+    chart = netflix.conduct_analysis(view, "Trends", "Nobody", "All Types", "All Titles", renderer="altair")
+    assert chart.to_dict()["mark"]["type"] == "text"
+
+
+@pytest.mark.parametrize("device, family", [
+    ("Apple iPhone 12 Pro", "Phone"),
+    ("Apple iPad Air 4", "Tablet"),
+    ("Samsung 2020 UHD TV", "TV"),
+    ("Roku 3", "TV"),
+    ("Sony PS5", "Console"),
+    ("Microsoft Xbox 360", "Console"),
+    ("Chrome PC (Cadmium)", "Browser"),
+    ("Mac", "Browser"),
+    ("Toaster", "Other"),
+])
+def test_device_families(device, family):
+    assert netflix.normalize_devices_and_countries(pd.DataFrame({"Device Type": [device], "Country": ["US (United States)"]}))["Device Family"][0] == family
+
+
+def test_country_codes(sample_data):
+    df = netflix.normalize_devices_and_countries(sample_data.copy())
+    assert dict(zip(df["Country"], df["Country Code"])) == {"US (United States)": "US", "Indonesia": "ID"}
+
+
+def test_family_rollup_matches_raw_totals(tmp_path, synthetic_data):
+    netflix.export_summary(synthetic_data, tmp_path, TIME_ZONE)
+    bundle = netflix.load_summary(tmp_path)
+    for analysis, column in [("Device Types", "Device Type"), ("Countries", "Country")]:
+        raw = netflix.aggregate_analysis(synthetic_data, analysis, "All Profiles", "All Types")
+        families = netflix.aggregate_analysis(synthetic_data, analysis, "All Profiles", "All Types", rollup=True)
+        pd.testing.assert_series_equal(families.sum(axis=1), raw.sum(axis=1))
+        pd.testing.assert_frame_equal(netflix.aggregate_analysis(bundle, analysis, "All Profiles", "All Types", rollup=True), families, check_names=False)
+    assert set(netflix.aggregate_analysis(synthetic_data, "Device Types", "Jordan", "All Types", rollup=True).index) == {"Phone", "Tablet", "TV", "Browser", "Console"}
+
+
+def test_added_device_rule_takes_precedence():
+    netflix.add_device_rule(r"fridge", "Appliance")
+    try:
+        df = netflix.normalize_devices_and_countries(pd.DataFrame({"Device Type": ["Samsung Smart Fridge"], "Country": ["US (United States)"]}))
+        assert df["Device Family"][0] == "Appliance"
+    finally:
+        netflix._DEVICE_RULES.pop(0)
+        netflix._device_family.cache_clear()
+
+
+@pytest.mark.parametrize("analysis", ANALYSES)
+def test_conduct_analysis_renders_both_backends(sample_data, analysis):
+    figure = netflix.conduct_analysis(sample_data, analysis, "All Profiles", "All Types", "All Titles")
+    assert isinstance(figure, Figure)
+    netflix.release_figure(figure)
+
+    chart = netflix.conduct_analysis(sample_data, analysis, "All Profiles", "All Types", "All Titles", renderer="altair")
+    assert chart.to_dict()["title"] == netflix._analysis_title(analysis, "All Profiles", "All Types", "All Titles")
+
+
+def test_long_series_drawn_as_one_collection(multi_year_data):
+    figure = netflix.conduct_analysis(multi_year_data, "Viewing Activity Timeline", "All Profiles", "All Types", "All Titles")
+    ax = figure.axes[0]
+    assert not ax.patches and len(ax.collections) == 1
+    netflix.release_figure(figure)
+
+
+def test_both_backends_fold_the_same_categories(sample_data):
+    df = sample_data.assign(Country=[f"Country {i % 15}" for i in range(len(sample_data))])
+    data = netflix.aggregate_analysis(df, "Countries", "All Profiles", "All Types")
+    assert data.shape[1] == netflix._LEGEND_LIMIT and data.columns[-1] == "Other"
+
+    chart = netflix.conduct_analysis(df, "Countries", "All Profiles", "All Types", "All Titles", renderer="altair").to_dict()
+    assert {row["Category"] for rows in chart["datasets"].values() for row in rows} == set(data.columns)
+
+
+@pytest.mark.performance
+def test_preparation_within_budget(large_data):
+    df = netflix.load_data(large_data)
+    timings = {"load_data": _best_time(netflix.load_data, large_data, rounds=1)}
+    timings["convert_times"] = _best_time(netflix.convert_times, df.copy(), TIME_ZONE, rounds=1)
+    df = netflix.convert_times(df, TIME_ZONE)
+    timings["separate_types_of_content"] = _best_time(netflix.separate_types_of_content, df.copy())
+    df = netflix.separate_types_of_content(df)
+    timings["build_filter_index"] = _best_time(netflix.build_filter_index, df)
+    timings["normalize_devices_and_countries"] = _best_time(netflix.normalize_devices_and_countries, df.copy())
+    timings["summarize_data"] = _best_time(netflix.summarize_data, df)
+
+    for step, budget in PREPARATION_BUDGETS.items():
+        assert timings[step] < budget, f"{step} took {timings[step]:.2f}s, budget is {budget}s"
+
+
+@pytest.fixture(scope="module")
+def large_prepared(large_data) -> pd.DataFrame:
+    return prepare(large_data)
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("analysis", ANALYSES)
+def test_aggregation_within_budget(large_prepared, analysis):
+    elapsed = _best_time(netflix.aggregate_analysis, large_prepared, analysis, "All Profiles", "All Types")
+    assert elapsed < AGGREGATION_BUDGETS[analysis], f"{analysis} took {elapsed:.2f}s, budget is {AGGREGATION_BUDGETS[analysis]}s"
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize("analysis", ANALYSES)
+def test_rendering_within_budget(large_prepared, analysis):
+    def render():
+        netflix.release_figure(netflix.conduct_analysis(large_prepared, analysis, "All Profiles", "All Types", "All Titles"))
+
+    elapsed = _best_time(render)
+    assert elapsed < RENDER_BUDGETS[analysis], f"{analysis} took {elapsed:.2f}s, budget is {RENDER_BUDGETS[analysis]}s"
@@ -7,51 +7,207 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import sys
 import os
+import tempfile
+import zipfile
 from io import BytesIO
+from collections import OrderedDict
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src import viewing_activity_analysis as netflix
 
 
 st.title("Netflix Viewing Activity Analysis")
 
-uploaded_file = st.file_uploader("Upload your Netflix viewing activity CSV file", type=["csv"])
+FILTERED_VIEW_LIMIT = 16
+TREND_LIMIT = 16
+
+
+def filtered_view(profile, content_type, title):
+    """
+    Serves the rows matching the chosen filters, keeping recently used combinations.
+
+    Parameters:
+        profile (str): chosen profile(s) to analyze
+        content_type (str): chosen types of content to analyze
+        title (str): chosen title(s) to analyze
+
+    Returns:
+        pd.DataFrame | dict: viewing data or summary tables matching the filters
+    """
+
+    views = st.session_state.filtered_views
+    key = (profile, content_type, title)
+    if key in views:
+        views.move_to_end(key)
+    else:
+        if st.session_state.filter_index is None:
+            views[key] = netflix.filter_summary(st.session_state.dataset, profile, content_type, title)
+        else:
+            views[key] = netflix.filter_view(st.session_state.dataset, st.session_state.filter_index, profile, content_type, title)
+        if len(views) > FILTERED_VIEW_LIMIT:
+            views.popitem(last=False)
+    return views[key]
+
+
+def trend_data(profile, content_type, title):
+    """
+    Serves the daily activity and rolling trends of the chosen filters, keeping recently used combinations.
+
+    Parameters:
+        profile (str): chosen profile(s) to analyze
+        content_type (str): chosen types of content to analyze
+        title (str): chosen title(s) to analyze
+
+    Returns:
+        tuple: daily activity and rolling trends matching the filters
+    """
+
+    cache = st.session_state.trends
+    key = (profile, content_type, title)
+    if key in cache:
+        cache.move_to_end(key)
+    else:
+        daily = netflix.aggregate_analysis(filtered_view(profile, content_type, title), "Trends", profile, content_type)
+        cache[key] = (daily, netflix.rolling_trends(daily))
+        if len(cache) > TREND_LIMIT:
+            cache.popitem(last=False)
+    return cache[key]
+
+
+def extended_trends(previous, df):
+    """
+    Carries kept trends over to a newer export of the same history, recounting only the days it added.
+
+    Parameters:
+        previous (pd.DataFrame): viewing data the kept trends were computed from
+        df (pd.DataFrame): viewing data of the newer export
+
+    Returns:
+        OrderedDict: daily activity and rolling trends keyed by filters, empty if df does not continue previous
+    """
+
+    trends = OrderedDict()
+    if previous.empty or df.empty:
+        return trends
+    since = previous["Date"].max().normalize()
+    # Only an export that holds the same rows before the last kept day is a continuation of it
+    if (previous["Date"] < since).sum() != (df["Date"] < since).sum():
+        return trends
+
+    recent = df[df["Date"] >= since]
+    recent_index = netflix.build_filter_index(recent)
+    for key, (daily, kept) in st.session_state.trends.items():
+        trends[key] = netflix.extend_trends(daily, kept, netflix.filter_view(recent, recent_index, *key), since)
+    return trends
+
+
+def bundle_archive(df, time_zone):
+    """
+    Packs a summary bundle of the viewing data into a zip archive that can be downloaded and uploaded again.
+
+    Parameters:
+        df (pd.DataFrame): viewing data separated by type of content
+        time_zone (str): time zone the viewing data was converted to
+
+    Returns:
+        bytes: zip archive holding the bundle's manifest and Parquet tables
+    """
+
+    buffer = BytesIO()
+    with tempfile.TemporaryDirectory() as folder:
+        netflix.export_summary(df, folder, time_zone)
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for name in os.listdir(folder):
+                archive.write(os.path.join(folder, name), name)
+    return buffer.getvalue()
+
+
+def open_bundle(archive_file):
+    """
+    Reads a summary bundle from an uploaded zip archive made by bundle_archive.
+
+    Parameters:
+        archive_file: uploaded zip archive
+
+    Returns:
+        tuple: summary tables keyed by name and the time zone they were exported in
+    """
+
+    with tempfile.TemporaryDirectory() as folder:
+        with zipfile.ZipFile(archive_file) as archive:
+            archive.extractall(folder)
+        return netflix.load_summary(folder), netflix.summary_time_zone(folder)
+
+
+uploaded_file = st.file_uploader("Upload your Netflix viewing activity CSV file or a summary bundle", type=["csv", "zip"])
 if uploaded_file:
-    try:
-        df = netflix.load_data(uploaded_file)
-    except Exception as e:
-        st.error(f"Error loading file: {e}")
-        st.stop()
+    from_bundle = uploaded_file.name.lower().endswith(".zip")
+    if st.session_state.get("raw_file_id") != uploaded_file.file_id:
+        try:
+            if from_bundle:
+                st.session_state.raw_data, st.session_state.bundle_time_zone = open_bundle(uploaded_file)
+            else:
+                st.session_state.raw_data = netflix.load_data(uploaded_file)
+        except Exception as e:
+            st.error(f"Error loading file: {e}")
+            st.stop()
+        st.session_state.raw_file_id = uploaded_file.file_id
     
     st.header("Filters")
     st.sidebar.header("Analysis Settings")
 
-    with open("data/time_zones.txt", "r") as time_zones_file:
-        time_zones = [line.strip() for line in time_zones_file.readlines()]
-    
-    time_zone = st.selectbox("Select Your Time Zone", time_zones, index=time_zones.index("America/New_York"))
-    df = netflix.convert_times(df, time_zone)
-
-    profiles = ["All Profiles"] + sorted(df["Profile Name"].unique())
-    profile = st.selectbox("Select a Profile", profiles)
-    if profile != "All Profiles":
-        df = df[df["Profile Name"] == profile]
+    # A bundle was summarized in one time zone, so its dates and hours cannot be converted again
+    if from_bundle:
+        time_zone = st.session_state.bundle_time_zone
+        st.caption(f"Summary bundle times are in {time_zone}")
+    else:
+        with open("data/time_zones.txt", "r") as time_zones_file:
+            time_zones = [line.strip() for line in time_zones_file.readlines()]
+        
+        time_zone = st.selectbox("Select Your Time Zone", time_zones, index=time_zones.index("America/New_York"))
 
+    # Convert and index the upload once per time zone so filter changes only look up row positions
+    dataset_key = (uploaded_file.file_id, time_zone)
+    previous_key = st.session_state.get("dataset_key")
+    if previous_key != dataset_key:
+        trends = OrderedDict()
+        if from_bundle:
+            df = st.session_state.raw_data
+            profiles = df["daily"]["Profile Name"].unique()
+            filter_index = None
+        else:
+            df = netflix.convert_times(st.session_state.raw_data.copy(), time_zone)
+            df = netflix.separate_types_of_content(df)
+            df = netflix.normalize_devices_and_countries(df)
+            filter_index = netflix.build_filter_index(df)
+            profiles = list(filter_index["Profile Name"])
+            if previous_key and previous_key[1] == time_zone and st.session_state.filter_index is not None and st.session_state.trends:
+                trends = extended_trends(st.session_state.dataset, df)
+        st.session_state.dataset = df
+        st.session_state.filter_index = filter_index
+        st.session_state.profiles = ["All Profiles"] + sorted(profiles)
+        st.session_state.trends = trends
+        st.session_state.filtered_views = OrderedDict()
+        st.session_state.title_lists = {}
+        st.session_state.dataset_key = dataset_key
 
-    df = netflix.separate_types_of_content(df)
+    profile = st.selectbox("Select a Profile", st.session_state.profiles)
 
     content_types = ["All Types", "Movie", "TV Show"]
     content_type = st.selectbox("Select Content Type", content_types)
-    if content_type != "All Types":
-        df = df[df["Type"] == content_type]
-    
-    titles = ["All Titles"] + sorted(df["Name"].dropna().unique())
+
+    if (profile, content_type) not in st.session_state.title_lists:
+        view = filtered_view(profile, content_type, "All Titles")
+        names = view["daily"]["Name"] if from_bundle else view["Name"]
+        st.session_state.title_lists[(profile, content_type)] = ["All Titles"] + sorted(names.dropna().unique())
+    titles = st.session_state.title_lists[(profile, content_type)]
     title = st.selectbox("Select Title", titles)
-    if title != "All Titles":
-        df = df[df["Name"] == title]
+
+    df = filtered_view(profile, content_type, title)
     
-    options = ["Viewing Frequency", "Viewing Activity Timeline", "Viewing Heat Map", "Most Watched Days", "Duration", "Most Watched Movies", "Most Watched Shows","Most Watched Episodes", "Device Types", "Countries"]
+    options = ["Viewing Frequency", "Viewing Activity Timeline", "Viewing Heat Map", "Most Watched Days", "Duration", "Most Watched Movies", "Most Watched Shows","Most Watched Episodes", "Device Types", "Countries", "Trends"]
 
     if content_type == "Movie":
         options.remove("Most Watched Episodes")
@@ -62,23 +218,55 @@ if uploaded_file:
             options.remove("Most Watched Episodes")
 
     analysis_option = st.sidebar.selectbox("Choose Analysis", options)
+    interactive = st.sidebar.toggle("Interactive Charts", value=True)
+    renderer = "altair" if interactive else "matplotlib"
+    rollup = False
+    if analysis_option in ("Device Types", "Countries"):
+        rollup = st.sidebar.checkbox("Group Into Device Families and Country Codes")
 
     if "analysis_history" not in st.session_state:
         st.session_state.analysis_history = []
+    if "png_exports" not in st.session_state:
+        st.session_state.png_exports = {}
     
     if st.sidebar.button("Run Analysis"):
-        figure = netflix.conduct_analysis(df, analysis_option, profile, content_type, title)
-        st.session_state.analysis_history.append((analysis_option, figure))
+        daily, trends = trend_data(profile, content_type, title) if analysis_option == "Trends" else (None, None)
+        chart = netflix.conduct_analysis(df, analysis_option, profile, content_type, title, renderer, rollup, daily, trends)
+        export_args = (df, analysis_option, profile, content_type, title, "matplotlib", rollup, daily, trends)
+        st.session_state.analysis_history.append((analysis_option, chart, export_args))
     
+    # Summarize the whole upload only when asked, so it can be reopened later without the raw history
+    if not from_bundle:
+        if st.sidebar.button("Export Summary Bundle"):
+            st.session_state.bundle_export = (dataset_key, bundle_archive(st.session_state.dataset, time_zone))
+        if st.session_state.get("bundle_export", (None, None))[0] == dataset_key:
+            st.sidebar.download_button(label="Download Summary Bundle", data=st.session_state.bundle_export[1], file_name="viewing_summary.zip", mime="application/zip")
+
     if st.sidebar.button("Clear All Results"):
+        for _, chart, _ in st.session_state.analysis_history:
+            if isinstance(chart, Figure):
+                netflix.release_figure(chart)
         st.session_state.analysis_history = []
+        st.session_state.png_exports = {}
 
     st.subheader("Analysis Results")
-    for i, (label, figure) in enumerate(reversed(st.session_state.analysis_history)):
+    for i, (label, chart, export_args) in reversed(list(enumerate(st.session_state.analysis_history))):
         st.markdown(f"**{label}**")
-        st.pyplot(figure)
-        buffer = BytesIO()
-        figure.savefig(buffer, format="png", bbox_inches="tight")
-        buffer.seek(0)
-        st.download_button(label="Download Figure", data=buffer, file_name=f"{label.replace(" ", "_").lower()}.png", mime="image/png", key=f"download_{i}")
-        st.markdown("---")
\ No newline at end of file
+        if isinstance(chart, Figure):
+            st.pyplot(chart)
+        else:
+            st.altair_chart(chart, use_container_width=True)
+
+        # Rasterize to PNG only when the user asks for it
+        if i not in st.session_state.png_exports:
+            if st.button("Export PNG", key=f"export_{i}"):
+                figure = chart if isinstance(chart, Figure) else netflix.conduct_analysis(*export_args)
+                buffer = BytesIO()
+                figure.savefig(buffer, format="png", bbox_inches="tight")
+                st.session_state.png_exports[i] = buffer.getvalue()
+                if figure is not chart:
+                    netflix.release_figure(figure)
+        if i in st.session_state.png_exports:
+            file_name = label.replace(" ", "_").lower() + ".png"
+            st.download_button(label="Download Figure", data=st.session_state.png_exports[i], file_name=file_name, mime="image/png", key=f"download_{i}")
+        st.markdown("---")